@@ -0,0 +1,97 @@
+"""Profile the startup of the dashboard, by the time it takes to import its modules.
+
+Imports the app in a fresh interpreter with `python -X importtime`, and reports the modules which take longest to
+import (including the modules they import) and the time per package. Importing the app also loads the dataset, which
+is included in the time of `dashboard.main`. Run from the root of the repository:
+
+    python -m benchmarks.importtime                             # profile the import of dashboard.main
+    python -m benchmarks.importtime --module dashboard.batch    # profile the import of another module
+
+Some packages are only needed once a page uses them (e.g. the LLM pages), and are imported on first use. The profile
+fails if one of these is imported at startup, to catch imports which undo this.
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+
+from loguru import logger
+
+DEFAULT_MODULE = "dashboard.main"
+DEFAULT_REPEAT = 3
+DEFAULT_TOP = 20
+
+# Packages which are imported on first use, instead of at startup
+DEFERRED = ["langchain", "langchain_community", "langchain_openai", "openai", "plotly.express"]
+
+
+def profile(module: str) -> list[tuple[str, int, int]]:
+    """Import a module in a fresh interpreter.
+
+    Returns:
+        list[tuple[str, int, int]]: name, own time and cumulative time (in microseconds) per imported module, in the
+        order in which their imports finished
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-2000:]}")
+
+    imports = []
+    for line in process.stderr.splitlines():
+        # e.g. "import time:       412 |      18420 |   dash.dcc"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        if not own.strip().isdigit():  # The header of the table
+            continue
+        imports.append((name.strip(), int(own), int(cumulative)))
+    return imports
+
+
+def package_times(imports: list[tuple[str, int, int]], depth: int = 1) -> dict[str, int]:
+    """Sum the own time of the modules per package, e.g. "dash" for "dash.dcc" (depth 1)."""
+    times = defaultdict(int)
+    for name, own, _ in imports:
+        times[".".join(name.split(".")[:depth])] += own
+    return dict(times)
+
+
+def report(imports: list[tuple[str, int, int]], top: int) -> None:
+    total = sum(own for _, own, _ in imports)
+    print(f"Total: {total / 1000:.0f} ms ({len(imports)} modules)\n")
+
+    print(f"{'Module (cumulative)':<60} {'Time':>10}")
+    for name, _, cumulative in sorted(imports, key=lambda item: item[2], reverse=True)[:top]:
+        print(f"{name:<60} {cumulative / 1000:>8.1f}ms")
+
+    print(f"\n{'Package (own time of its modules)':<60} {'Time':>10}")
+    packages = sorted(package_times(imports).items(), key=lambda item: item[1], reverse=True)
+    for package, own in packages[:top]:
+        print(f"{package:<60} {own / 1000:>8.1f}ms {own / total:>6.1%}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module to import")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="number of runs, the fastest is reported")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="number of modules and packages to report")
+    args = parser.parse_args()
+
+    # The first run also warms the caches (e.g. of the dataset and bytecode), like a restarted worker
+    runs = [profile(args.module) for _ in range(args.repeat)]
+    imports = min(runs, key=lambda run: sum(own for _, own, _ in run))
+    report(imports, args.top)
+
+    names = {name for name, _, _ in imports}
+    deferred = [package for package in DEFERRED if package in names]
+    if deferred:
+        logger.error(f"Imported at startup, instead of on first use: {', '.join(deferred)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Load test a running dashboard by replaying recorded sessions against the Dash callback endpoint.
+
+Every virtual user repeatedly replays a random session from `sessions.json` (navigating to a page and changing its
+inputs) until the duration has passed. Afterwards the latency percentiles and throughput are reported per callback,
+which can be used to tune the number of gunicorn workers and threads.
+
+Start the server (e.g. `gunicorn --config gunicorn.conf.py dashboard.main:server`) and run from the root of the
+repository:
+
+    python -m benchmarks.loadtest --url http://127.0.0.1:8050 --users 8 --duration 60
+
+Sessions of the LLM pages are skipped unless `--llm` is given, as every step invokes the configured model. Start the
+server with `LLM_BACKEND=fake` to use a local model replaying scripted SQL queries instead of the OpenAI API. The LLM
+pages answer in a background job, which is polled until it is done; the time until then is reported as "(done)".
+
+The test stops and fails on the first server error (a 5xx response), e.g. a recorded session which no longer matches
+the callbacks of the app.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+SESSIONS_FILE = Path(__file__).parent / "sessions.json"
+CALLBACK_PATH = "/_dash-update-component"
+
+
+def build_request(step: dict) -> dict:
+    """Build the body of a Dash callback request, as sent by the browser."""
+    outputs = step["outputs"]
+    if isinstance(outputs, list):
+        output = ".." + "...".join(f"{item['id']}.{item['property']}" for item in outputs) + ".."
+    else:
+        output = f"{outputs['id']}.{outputs['property']}"
+
+    # The first input with a value triggered the callback
+    changed = [f"{item['id']}.{item['property']}" for item in step["inputs"] if isinstance(item, dict)][:1]
+
+    return {
+        "output": output,
+        "outputs": outputs,
+        "inputs": step["inputs"],
+        "changedPropIds": changed,
+        "state": step.get("state", []),
+    }
+
+
+def call(url: str, step: dict, timeout: float) -> tuple[float, int | None, dict]:
+    """Send a single callback request.
+
+    Returns:
+        tuple[float, int | None, dict]: latency in seconds, HTTP status of the response (None when there was no
+        response) and the updated properties
+    """
+    data = json.dumps(build_request(step)).encode()
+    request = urllib.request.Request(url + CALLBACK_PATH, data=data, headers={"Content-Type": "application/json"})
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, body = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, body = e.code, b""
+    except (urllib.error.URLError, TimeoutError):
+        status, body = None, b""
+    updates = json.loads(body).get("response", {}) if status == 200 and body else {}
+    return time.perf_counter() - start, status, updates
+
+
+def succeeded(status: int | None) -> bool:
+    return status in (200, 204)
+
+
+def server_error(status: int | None) -> bool:
+    return status is not None and status >= 500
+
+
+def poll(url: str, step: dict, updates: dict, timeout: float) -> int | None:
+    """Poll the background job started by a step until it is done, like the dcc.Interval of the page.
+
+    The `poll` of the step names the store holding the id of the job, and the callback request which is polled.
+
+    Returns:
+        int | None: HTTP status of the last poll, or None when the job did not finish within the timeout
+    """
+    store = step["poll"]["store"]
+    job_id = updates.get(store, {}).get("data")
+    deadline = time.monotonic() + timeout
+    status = 200
+    while job_id is not None and time.monotonic() < deadline:
+        time.sleep(step["poll"]["interval"])
+        poll_step = dict(step["poll"]["step"])
+        poll_step["state"] = [
+            {**item, "value": job_id} if item["id"] == store else item for item in poll_step.get("state", [])
+        ]
+        _, status, updates = call(url, poll_step, timeout)
+        if not succeeded(status):
+            return status
+        # The callback clears the id of the job once it is done
+        if store in updates:
+            job_id = updates[store]["data"]
+    return status if job_id is None else None
+
+
+def virtual_user(
+    url: str, sessions: list[dict], deadline: float, timeout: float, seed: int, results: dict, lock, failed
+):
+    """Replay random sessions until the deadline has passed, or a request of any user failed with a server error."""
+    rng = random.Random(seed)
+    while time.monotonic() < deadline and not failed.is_set():
+        session = rng.choice(sessions)
+        for step in session["steps"]:
+            start = time.perf_counter()
+            latency, status, updates = call(url, step, timeout)
+            with lock:
+                results[step["name"]].append((latency, status))
+
+            if succeeded(status) and "poll" in step:
+                status = poll(url, step, updates, timeout)
+                with lock:
+                    results[f"{step['name']} (done)"].append((time.perf_counter() - start, status))
+
+            if server_error(status):
+                logger.error(f"Step {step['name']} of session {session['name']} failed with HTTP {status}")
+                failed.set()
+                return
+
+
+def report(results: dict, elapsed: float) -> None:
+    """Print latency percentiles and throughput per callback."""
+    print(f"{'Callback':<30} {'Requests':>9} {'Errors':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8}")
+
+    total = []
+    for name, samples in sorted(results.items()) + [("total", None)]:
+        if samples is None:
+            samples = total
+        else:
+            total += samples
+
+        latencies = np.array([latency for latency, _ in samples]) * 1000
+        errors = sum(not succeeded(status) for _, status in samples)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+        print(
+            f"{name:<30} {len(samples):>9} {errors:>7} {p50:>7.0f}ms {p95:>7.0f}ms {p99:>7.0f}ms "
+            f"{len(samples) / elapsed:>8.1f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8050", help="URL of the running dashboard")
+    parser.add_argument("--users", type=int, default=4, help="number of concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="duration of the test in seconds")
+    parser.add_argument("--timeout", type=float, default=120, help="timeout per request in seconds")
+    parser.add_argument("--sessions", type=Path, default=SESSIONS_FILE, help="path of the recorded sessions")
+    parser.add_argument("--llm", action="store_true", help="include sessions of the LLM pages")
+    parser.add_argument("--seed", type=int, default=0, help="seed for picking sessions")
+    args = parser.parse_args()
+
+    sessions = json.loads(args.sessions.read_text())
+    if not args.llm:
+        sessions = [session for session in sessions if not any(step.get("llm") for step in session["steps"])]
+
+    results = defaultdict(list)
+    lock = threading.Lock()
+    failed = threading.Event()
+    url = args.url.rstrip("/")
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        futures = [
+            executor.submit(
+                virtual_user, url, sessions, deadline, args.timeout, args.seed + user, results, lock, failed
+            )
+            for user in range(args.users)
+        ]
+        for future in futures:
+            future.result()
+
+    report(results, time.monotonic() - start)
+    if failed.is_set():
+        logger.error("The load test failed with a server error, see above")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
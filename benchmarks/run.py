@@ -0,0 +1,253 @@
+"""Benchmarks of loading, filtering, aggregating and building figures for every page.
+
+Every benchmark runs on the real dataset and on synthetic datasets which are a multiple (e.g. 10x, 100x) of it.
+Run from the root of the repository:
+
+    python -m benchmarks.run                   # run all benchmarks
+    python -m benchmarks.run --save            # run all benchmarks and store the results as baseline
+    python -m benchmarks.run --compare         # run all benchmarks and report regressions against the baseline
+                                               # (exits with 1 on regressions, and with 2 without a baseline)
+    python -m benchmarks.run --check-mutations # run all benchmarks and report benchmarks modifying the dataset
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dash import Dash
+from loguru import logger
+
+from dashboard.data.aggregates import COUNT_COLUMNS, CodeTable, PriceCube
+from dashboard.data.cuisine_index import build_cuisine_index, filter_by_cuisine
+from dashboard.data.database import Database
+from dashboard.data.loader import add_features, load_data
+from dashboard.data.ranking import Ranking
+from dashboard.data.search import SearchIndex
+from dashboard.data.vectors import VectorIndex, restaurant_texts
+from dashboard.decorators import DatasetMutationError, fingerprint
+from dashboard.graphs import graphs
+from dashboard.store import DatasetStore
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25  # Report a regression if a benchmark is 25% slower than the baseline
+BENCHMARK_COUNTRY = "France"
+TOP_CUISINES = 5
+SEARCH_QUERIES = ["seafood tasting menu", "vegetarian", "french bistro wine", "sushi omakase", "farm to table"]
+FUZZY_QUERIES = ["Le Bernadin", "Osteria Franciscana", "Noma Copenhagn", "Sushi Saito", "Mirazur"]
+
+# Pages can only be registered once an app using pages exists
+app = Dash(__name__, use_pages=True, pages_folder="")
+
+from dashboard.pages import countries, overview, pricing  # noqa: E402
+
+
+def scale_dataset(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """Create a synthetic dataset by repeating the dataset, with unique names and slightly moved locations."""
+    if factor == 1:
+        return df
+
+    rng = np.random.default_rng(seed=0)
+    frames = []
+    for i in range(factor):
+        frame = df.copy()
+        frame["Name"] = frame["Name"] + f" ({i})"
+        frame["Latitude"] = frame["Latitude"] + rng.normal(0, 0.01, len(frame))
+        frame["Longitude"] = frame["Longitude"] + rng.normal(0, 0.01, len(frame))
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def search_benchmarks(df: pd.DataFrame) -> dict:
+    """Get the benchmarks of the search and vector index."""
+    search_index = SearchIndex(df)
+    texts = restaurant_texts(df)
+    vector_index = VectorIndex.build(texts)
+    country_mask = (df["Country"] == BENCHMARK_COUNTRY).to_numpy()
+
+    def search():
+        for query in SEARCH_QUERIES:
+            search_index.search(query)
+
+    def fuzzy_names():
+        for query in FUZZY_QUERIES:
+            search_index.fuzzy_names(query)
+
+    return {
+        "search.build_index": lambda: SearchIndex(df),
+        "search.search (queries)": search,
+        "search.fuzzy_names (queries)": fuzzy_names,
+        "vectors.build": lambda: VectorIndex.build(texts),
+        "vectors.query (queries, batched)": lambda: vector_index.query(SEARCH_QUERIES),
+        "vectors.query (queries, filtered)": lambda: vector_index.query(SEARCH_QUERIES, mask=country_mask),
+    }
+
+
+def benchmarks(df: pd.DataFrame, scale: int) -> dict:
+    """Get the benchmarks to run on a dataset."""
+    country_df = df[df["Country"] == BENCHMARK_COUNTRY]
+    all_countries = sorted(df["Country"].dropna().unique())
+    cuisine_index = build_cuisine_index(df)
+    top_cuisines = sorted(cuisine_index, key=lambda cuisine: len(cuisine_index[cuisine]), reverse=True)[:TOP_CUISINES]
+
+    database = Database()
+    database.DB_FILE = Path(tempfile.mkdtemp()) / "michelin.db"
+
+    def load_database():
+        database.DB_FILE.unlink(missing_ok=True)
+        database.load(df)
+
+    def geo_cuisine_map():
+        for cuisine in top_cuisines:
+            graphs.graph_map_cuisine(filter_by_cuisine(df, cuisine_index, cuisine))
+
+    def countries_callback():
+        for country in all_countries:
+            countries.update_numbers(country)
+
+    def pricing_callback():
+        for country in all_countries:
+            pricing.update_price_distribution(country)
+            pricing.update_best_value_scatter(country)
+
+    code_table = CodeTable(df)
+    ranking = Ranking(df)
+
+    cases = {
+        "loader.add_features": lambda: add_features(df.copy()),
+        "aggregates.value_counts (per column)": lambda: [df[column].value_counts() for column in COUNT_COLUMNS],
+        "aggregates.code_table (build)": lambda: CodeTable(df),
+        "aggregates.code_table (single pass)": code_table.counts,
+        "aggregates.price_cube (build)": lambda: PriceCube(df),
+        "data.build_cuisine_index": lambda: build_cuisine_index(df),
+        "ranking.build": lambda: Ranking(df),
+        "ranking.nlargest (all countries)": lambda: [
+            df[df["Country"] == country].nlargest(10, "Value") for country in all_countries
+        ],
+        "ranking.best_value (all countries)": lambda: [ranking.best_value(country) for country in all_countries],
+        "database.load": load_database,
+        "graphs.graph_top_countries": lambda: graphs.graph_top_countries(df),
+        "graphs.graph_top_cities": lambda: graphs.graph_top_cities(df),
+        "graphs.graph_top_cuisine": lambda: graphs.graph_top_cuisine(df),
+        "graphs.graph_award_distribution": lambda: graphs.graph_award_distribution(df),
+        "graphs.graph_green_star_distribution": lambda: graphs.graph_green_star_distribution(df),
+        "graphs.graph_map": lambda: graphs.graph_map(country_df),
+        "graphs.graph_map_cuisine": lambda: graphs.graph_map_cuisine(df),
+        "graphs.graph_green_star_map": lambda: graphs.graph_green_star_map(df),
+        "graphs.graph_price_distribution": lambda: graphs.graph_price_distribution(country_df),
+        "graphs.graph_price_distribution_normalized": lambda: graphs.graph_price_distribution_normalized(df),
+        "graphs.graph_scatter_best_value": lambda: graphs.graph_scatter_best_value(country_df),
+        "graphs.graph_heatmap_price": lambda: graphs.graph_heatmap_price(country_df),
+        "callback.overview": lambda: overview.update_overview(None),
+        "callback.countries (all countries)": countries_callback,
+        "callback.pricing (all countries)": pricing_callback,
+        "pipeline.geo_cuisine_map (top cuisines)": geo_cuisine_map,
+        **search_benchmarks(df),
+    }
+    if scale == 1:
+        cases["loader.load_data"] = load_data
+    return cases
+
+
+def run(scales: list[int], repeat: int, only: str | None = None, check_mutations: bool = False) -> dict:
+    """Run all benchmarks for all scales.
+
+    Args:
+        check_mutations (bool): verify that no benchmark modifies the dataset it is given
+
+    Raises:
+        DatasetMutationError: if a benchmark modified the dataset
+
+    Returns:
+        dict: minimum and median duration (in seconds) per benchmark
+    """
+    df = load_data()
+    results = {}
+
+    for scale in scales:
+        scaled_df = scale_dataset(df, scale)
+        # Callbacks retrieve the dataset from the store
+        DatasetStore().set(scaled_df)
+        logger.info(f"Running benchmarks on {len(scaled_df)} restaurants ({scale}x)..")
+
+        for name, func in benchmarks(scaled_df, scale).items():
+            if only and only not in name:
+                continue
+            before = fingerprint(scaled_df) if check_mutations else None
+            durations = timeit.repeat(func, repeat=repeat, number=1)
+            key = f"{name} [{scale}x]"
+            if check_mutations and fingerprint(scaled_df) != before:
+                raise DatasetMutationError(f"{key} modified the dataset")
+            results[key] = {"min": min(durations), "median": statistics.median(durations)}
+            logger.info(f"{key}: {results[key]['median'] * 1000:.1f} ms")
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Compare results with the baseline.
+
+    Returns:
+        list[str]: benchmarks which are slower than the baseline by more than the threshold
+    """
+    regressions = []
+    logger.info(f"{'Benchmark':<60} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for key, result in results.items():
+        if key not in baseline:
+            logger.info(f"{key:<60} {'-':>12} {result['median'] * 1000:>10.1f}ms {'new':>8}")
+            continue
+
+        change = result["median"] / baseline[key]["median"] - 1
+        marker = ""
+        if change > threshold:
+            regressions.append(key)
+            marker = " !"
+        logger.info(
+            f"{key:<60} {baseline[key]['median'] * 1000:>10.1f}ms {result['median'] * 1000:>10.1f}ms "
+            f"{change:>+7.0%}{marker}"
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="dataset sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="number of runs per benchmark")
+    parser.add_argument("--only", help="only run benchmarks containing this string")
+    parser.add_argument("--save", action="store_true", help="store the results as baseline")
+    parser.add_argument("--compare", action="store_true", help="compare the results with the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="path of the baseline")
+    parser.add_argument("--check-mutations", action="store_true", help="fail if a benchmark modifies the dataset")
+    args = parser.parse_args()
+
+    if args.compare and not args.save and not args.baseline.is_file():
+        logger.error(f"No baseline found at {args.baseline}, store one first using --save")
+        return 2
+
+    # Like the app, so the benchmarks measure the callbacks as they run in the app
+    pd.set_option("mode.copy_on_write", True)
+    results = run(args.scales, args.repeat, args.only, args.check_mutations)
+
+    if args.save:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        logger.info(f"Stored baseline in {args.baseline}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            logger.error(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
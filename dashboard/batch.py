@@ -0,0 +1,234 @@
+"""Make recommendations for many user profiles at once, e.g. to precompute recommendations overnight.
+
+Every line of the input file is a JSON object with the fields of the recommendations form (all optional):
+
+    {"location": "Paris", "cuisine": "Seafood", "price_range": ["Premium"], "award_range": ["1 Star"],
+     "description": "tasting menu with a view"}
+
+Identical profiles are processed once. Every line of the output file holds the profile, its candidates and (with
+`--llm`) the recommendation of the LLM, in the order in which the profiles are finished. Run from the root of the
+repository:
+
+    python -m dashboard.batch profiles.jsonl recommendations.jsonl --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+
+# The settings of the modules are read when these are imported, so the .env file is loaded first
+load_dotenv()
+
+from dashboard.data.database import Database  # noqa: E402
+from dashboard.data.llm import LLM  # noqa: E402
+from dashboard.data.loader import dataset_version, load_data  # noqa: E402
+from dashboard.data.recommendations import (  # noqa: E402
+    MAX_CANDIDATES,
+    find_candidates_batch,
+    format_candidates,
+    preference_mask,
+)
+from dashboard.store import DatasetStore  # noqa: E402
+
+PROFILE_FIELDS = ["location", "cuisine", "price_range", "award_range", "description"]
+DEFAULT_CHUNK_SIZE = 64
+
+
+def validate_profile(profile: dict) -> None:
+    """Validate the fields of a profile.
+
+    Raises:
+        ValueError: if the profile is not an object, or has unknown fields or fields of the wrong type
+    """
+    if not isinstance(profile, dict):
+        raise ValueError("A profile must be a JSON object")
+
+    unknown = set(profile) - set(PROFILE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    for field in ["location", "cuisine", "description"]:
+        if not isinstance(profile.get(field), (str, type(None))):
+            raise ValueError(f"'{field}' must be a string or null")
+    for field in ["price_range", "award_range"]:
+        values = profile.get(field)
+        if values is not None and not (isinstance(values, list) and all(isinstance(value, str) for value in values)):
+            raise ValueError(f"'{field}' must be a list of strings or null")
+
+
+def profile_key(profile: dict) -> tuple:
+    """Get a hashable key of a profile, which is identical for profiles leading to the same recommendations.
+
+    Raises:
+        ValueError: if the profile is invalid, see `validate_profile`
+    """
+    validate_profile(profile)
+
+    description = " ".join((profile.get("description") or "").split())
+    return (
+        profile.get("location") or None,
+        profile.get("cuisine") or None,
+        tuple(sorted(profile.get("price_range") or [])),
+        tuple(sorted(profile.get("award_range") or [])),
+        description or None,
+    )
+
+
+def read_profiles(path: Path) -> tuple[dict[tuple, list[int]], list[dict]]:
+    """Read the profiles of the input file.
+
+    Returns:
+        tuple[dict[tuple, list[int]], list[dict]]: line numbers per unique profile and the invalid lines
+    """
+    profiles, errors = {}, []
+    with path.open() as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                key = profile_key(json.loads(line))
+            except ValueError as e:
+                errors.append({"lines": [number], "error": f"Invalid profile: {e}"})
+                continue
+            profiles.setdefault(key, []).append(number)
+    return profiles, errors
+
+
+def init_worker(llm: bool) -> None:
+    """Prepare a worker process.
+
+    Workers which are forked inherit the dataset, vector index and ranking of the parent process. The search index
+    (and the database connections) can not be shared with a child process, so these are created by every worker.
+    """
+    # Workers which are not forked (e.g. on macOS) do not inherit the options of the parent process
+    pd.set_option("mode.copy_on_write", True)
+    store = DatasetStore()
+    if store.df is None:
+        store.set(load_data(), dataset_version())
+    store.get_search_index()
+
+    if llm:
+        database = Database()
+        if database.engine is None:
+            database.load(store.get(), store.version)
+        else:
+            database.reset_connections()
+        LLM()
+
+
+def recommend(keys: list[tuple], limit: int, llm: bool) -> list[tuple[tuple, dict]]:
+    """Make the recommendations for a chunk of unique profiles.
+
+    Returns:
+        list[tuple[tuple, dict]]: key and result per profile
+    """
+    store = DatasetStore()
+    df = store.get()
+
+    cuisine_index = store.get_cuisine_index(df)
+    masks = np.stack([preference_mask(df, cuisine_index, *key[:4]) for key in keys])
+    descriptions = [key[4] for key in keys]
+    all_candidates = find_candidates_batch(
+        store.get_search_index(df), store.get_vector_index(df), descriptions, masks, limit, store.get_ranking(df)
+    )
+
+    results = []
+    for key, candidates in zip(keys, all_candidates):
+        result = {"profile": dict(zip(PROFILE_FIELDS, key)), "candidates": candidates.to_dict("records")}
+        if llm:
+            location, cuisine, price_range, award_range, description = key
+            try:
+                result["recommendation"] = LLM().invoke_recommendations_llm(
+                    location, cuisine, list(price_range), list(award_range), description, format_candidates(candidates)
+                )
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+        results.append((key, result))
+    return results
+
+
+def run(input_path: Path, output_path: Path, workers: int, chunk_size: int, limit: int, llm: bool) -> dict:
+    """Make the recommendations for all profiles of the input file.
+
+    Returns:
+        dict: throughput statistics
+    """
+    start = time.perf_counter()
+    profiles, errors = read_profiles(input_path)
+    keys = list(profiles)
+    chunks = [keys[i : i + chunk_size] for i in range(0, len(keys), chunk_size)]
+    logger.info(f"Read {sum(map(len, profiles.values())) + len(errors)} lines with {len(keys)} unique profiles..")
+
+    # Load the shared structures before forking, so all workers share the same pages
+    store = DatasetStore()
+    store.set(load_data(), dataset_version())
+    store.get_vector_index()
+    store.get_ranking()
+    if llm:
+        Database().load(store.get(), store.version)
+
+    finished = failed = 0
+    pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(llm,))
+    with output_path.open("w") as output, pool:
+        for error in errors:
+            output.write(json.dumps(error) + "\n")
+
+        futures = {pool.submit(recommend, chunk, limit, llm): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                # A failing chunk (or worker) only fails its own profiles
+                logger.exception("Recommending a chunk of profiles failed")
+                error = f"{type(e).__name__}: {e}"
+                results = [
+                    (key, {"profile": dict(zip(PROFILE_FIELDS, key)), "error": error}) for key in futures[future]
+                ]
+
+            for key, result in results:
+                result = {"lines": profiles[key], **result}
+                output.write(json.dumps(result, default=str) + "\n")
+                finished += 1
+                failed += "error" in result
+            output.flush()
+            logger.info(f"Finished {finished}/{len(keys)} profiles..")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "lines": sum(map(len, profiles.values())) + len(errors),
+        "invalid_lines": len(errors),
+        "unique_profiles": len(keys),
+        "failed_profiles": failed,
+        "seconds": round(elapsed, 3),
+        "profiles_per_second": round(len(keys) / elapsed, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="JSONL file with one profile per line")
+    parser.add_argument("output", type=Path, help="JSONL file to write the recommendations to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="profiles per task of a worker")
+    parser.add_argument("--limit", type=int, default=MAX_CANDIDATES, help="number of candidates per profile")
+    parser.add_argument("--llm", action="store_true", help="let the LLM make a recommendation for every profile")
+    args = parser.parse_args()
+
+    # The dataset is shared with the workers without copying it, see `DatasetStore`
+    pd.set_option("mode.copy_on_write", True)
+    stats = run(args.input, args.output, args.workers, args.chunk_size, args.limit, args.llm)
+    logger.info(f"Throughput: {json.dumps(stats)}")
+    return 1 if stats["invalid_lines"] or stats["failed_profiles"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
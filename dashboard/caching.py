@@ -1,15 +1,87 @@
+import os
+
 import pandas as pd
+import plotly.graph_objects as go
+from flask import Flask
 from flask_caching import Cache
+from langchain_core.callbacks import BaseCallbackHandler
 
+from dashboard.data.editions import load_award_movement
+from dashboard.data.llm import LLM
 from dashboard.data.loader import load_data
+from dashboard.graphs.graphs import graph_green_star_map
 
 TIMEOUT = 60 * 60 * 24  # Cache data for approximately 1 day
 
-cache = Cache(config={"CACHE_TYPE": "filesystem", "CACHE_DIR": "cache"})
+CACHE_DIR = "cache/flask"
+MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", 64 * 2**20))  # Per namespace and process
+SHARED_MAX_BYTES = int(os.getenv("CACHE_SHARED_MAX_BYTES", 256 * 2**20))  # Per namespace
+DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_BYTES", 1024 * 2**20))  # Per namespace
+REDIS_URL = os.getenv("CACHE_REDIS_URL")  # Use Redis instead of SQLite as shared tier
+
+# Tiers per namespace, from fastest to slowest
+NAMESPACES = {
+    # The dataset is already held in memory by the DatasetStore
+    "dataset": ["shared", "disk"],
+    "aggregates": ["memory", "shared", "disk"],
+    "figures": ["memory", "shared", "disk"],
+    "llm": ["memory", "shared"],
+}
+
+
+def create_cache(namespace: str) -> Cache:
+    """Create the cache of a namespace, which has its own tiers and sizes."""
+    return Cache(
+        config={
+            "CACHE_TYPE": "dashboard.tiered_cache.TieredCache",
+            "CACHE_DEFAULT_TIMEOUT": TIMEOUT,
+            "CACHE_OPTIONS": {
+                "namespace": namespace,
+                "tiers": NAMESPACES[namespace],
+                "directory": CACHE_DIR,
+                "memory_max_bytes": MEMORY_MAX_BYTES,
+                "shared_max_bytes": SHARED_MAX_BYTES,
+                "disk_max_bytes": DISK_MAX_BYTES,
+                "redis_url": REDIS_URL,
+            },
+        }
+    )
+
+
+dataset_cache = create_cache("dataset")
+aggregates_cache = create_cache("aggregates")
+figures_cache = create_cache("figures")
+llm_cache = create_cache("llm")
+
 
+def init_app(server: Flask) -> None:
+    """Initialize the caches of all namespaces."""
+    for cache in [dataset_cache, aggregates_cache, figures_cache, llm_cache]:
+        cache.init_app(server)
 
-@cache.memoize(timeout=TIMEOUT)
+
+@dataset_cache.memoize(timeout=TIMEOUT)
 def retrieve_data() -> pd.DataFrame:
     """Function used to cache data."""
     data = load_data()
     return data
+
+
+@aggregates_cache.memoize(timeout=TIMEOUT)
+def retrieve_award_movement(previous: int, current: int, versions: tuple[str, str]) -> pd.DataFrame:
+    """Function used to cache the award movement between two editions, per version of both editions."""
+    return load_award_movement(previous, current)
+
+
+@figures_cache.memoize(timeout=TIMEOUT, args_to_ignore=["df"])
+def retrieve_green_star_map(version: str, df: pd.DataFrame) -> go.Figure:
+    """Function used to cache the Green Star map of a dataset version, given the dataset of that version."""
+    return graph_green_star_map(df)
+
+
+@llm_cache.memoize(timeout=TIMEOUT, args_to_ignore=["callbacks"])
+def retrieve_analysis_answer(
+    prompt: str, version: str, context: str | None = None, callbacks: list[BaseCallbackHandler] | None = None
+) -> str:
+    """Function used to cache the answers of the LLM to analysis questions, with their context, per dataset version."""
+    return LLM().invoke_analysis_llm(prompt, context, callbacks)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# Columns which are counted for the overview
+COUNT_COLUMNS = ["Country", "City", "Cuisine", "Award", "GreenStar", "Price (normalized)"]
+
+
+class CodeTable:
+    """Categorical codes of several columns, to count the values of all columns in a single pass.
+
+    The values of every column are numbered (factorized) once. The codes of all columns share one range of ids, so a
+    single `np.bincount` over all codes counts the values of all columns at once.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: list[str] = COUNT_COLUMNS) -> None:
+        self.columns = columns
+        self.categories = {}
+        self.offsets = {}
+
+        codes = []
+        offset = 0
+        for column in columns:
+            column_codes, categories = pd.factorize(df[column])
+            # Missing values (-1) get the id after the last category of the column, which is dropped when counting
+            column_codes = np.where(column_codes < 0, len(categories), column_codes)
+            codes.append(column_codes + offset)
+            self.categories[column] = categories
+            self.offsets[column] = offset
+            offset += len(categories) + 1
+
+        self.size = offset
+        self.codes = np.stack(codes, axis=1) if codes else np.empty((len(df), 0), dtype=np.intp)
+
+    def counts(self, positions: np.ndarray | None = None) -> dict[str, pd.Series]:
+        """Count the values of all columns, like `value_counts` per column.
+
+        Args:
+            positions (np.ndarray | None): row positions to count (e.g. of a filter), by default all rows
+
+        Returns:
+            dict[str, pd.Series]: number of restaurants per value, sorted descending, per column
+        """
+        codes = self.codes if positions is None else self.codes[positions]
+        totals = np.bincount(codes.ravel(), minlength=self.size)
+
+        counts = {}
+        for column in self.columns:
+            categories = self.categories[column]
+            start = self.offsets[column]
+            column_counts = pd.Series(
+                totals[start : start + len(categories)], index=pd.Index(categories, name=column), name="count"
+            )
+            column_counts = column_counts[column_counts > 0].sort_values(ascending=False, kind="stable")
+            counts[column] = column_counts
+        return counts
+
+
+class PriceCube:
+    """Number of restaurants and their total value per country, award and price, to slice the Pricing page per country.
+
+    Both are held as 3-D arrays (country x award x price), which are computed in a single pass over the dataset.
+    Prices are the price categories of the source (e.g. "€€"), which differ per currency.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        country_codes, self.countries = pd.factorize(df["Country"], sort=True)
+        award_codes, self.awards = pd.factorize(df["Award"], sort=True)
+        price_codes, self.prices = pd.factorize(df["Price"], sort=True)
+        self.awards.name, self.prices.name = "Award", "Price"
+
+        known = (country_codes >= 0) & (award_codes >= 0) & (price_codes >= 0)
+        shape = (len(self.countries), len(self.awards), len(self.prices))
+        cells = np.ravel_multi_index((country_codes[known], award_codes[known], price_codes[known]), shape)
+        size = int(np.prod(shape))
+
+        values = df["Value"].to_numpy(dtype=float)[known]
+        valued = ~np.isnan(values)
+        self.counts = np.bincount(cells, minlength=size).reshape(shape)
+        self.valued_counts = np.bincount(cells[valued], minlength=size).reshape(shape)
+        self.value_sums = np.bincount(cells[valued], weights=values[valued], minlength=size).reshape(shape)
+
+    def _index(self, country: str) -> int | None:
+        try:
+            return self.countries.get_loc(country)
+        except KeyError:
+            return None
+
+    def award_price_counts(self, country: str) -> pd.DataFrame:
+        """Get the number of restaurants per award (rows) and price (columns) of a country.
+
+        Only the prices of the country are included, and combinations without restaurants are NaN (like a pivot table).
+        """
+        i = self._index(country)
+        if i is None:
+            return pd.DataFrame(index=self.awards, columns=pd.Index([], name="Price"), dtype=float)
+
+        counts = self.counts[i]
+        prices = counts.sum(axis=0) > 0
+        return pd.DataFrame(counts[:, prices], index=self.awards, columns=self.prices[prices]).replace(0, np.nan)
+
+    def price_counts(self, country: str) -> pd.Series:
+        """Get the number of restaurants per price of a country, like `value_counts`."""
+        i = self._index(country)
+        counts = self.counts[i].sum(axis=0) if i is not None else np.zeros(len(self.prices), dtype=np.intp)
+        counts = pd.Series(counts, index=self.prices, name="count")
+        return counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+    def cells(self, country: str) -> pd.DataFrame:
+        """Get the number of restaurants and their mean value per award and price of a country.
+
+        Returns:
+            pd.DataFrame: one row per combination of award and price with restaurants, with the columns 'Award',
+            'Price', 'count' and 'Value'
+        """
+        i = self._index(country)
+        if i is None:
+            return pd.DataFrame(columns=["Award", "Price", "count", "Value"])
+
+        awards, prices = np.nonzero(self.counts[i])
+        valued_counts = self.valued_counts[i, awards, prices]
+        mean_values = self.value_sums[i, awards, prices] / np.maximum(valued_counts, 1)
+        return pd.DataFrame(
+            {
+                "Award": self.awards[awards],
+                "Price": self.prices[prices],
+                "count": self.counts[i, awards, prices],
+                "Value": np.where(valued_counts > 0, mean_values, np.nan).round(1),
+            }
+        )
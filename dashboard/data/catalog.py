@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.data.cuisine_index import cuisine_options
+from dashboard.data.utils import unique_countries
+
+
+def build_catalog(df: pd.DataFrame, cuisine_index: dict[str, np.ndarray]) -> dict[str, list[str]]:
+    """Build the dimension catalog: the option lists used by the dropdowns of the pages.
+
+    Args:
+        df (pd.DataFrame): dataset
+        cuisine_index (dict[str, np.ndarray]): cuisine index of the dataset
+
+    Returns:
+        dict[str, list[str]]: sorted options per dimension
+    """
+    return {
+        "countries": sorted(unique_countries(df)),
+        "locations": construct_location_options(df),
+        "cuisines": cuisine_options(cuisine_index),
+    }
+
+
+def construct_location_options(df: pd.DataFrame) -> list[str]:
+    """Construct a list with all countries and cities."""
+    locations = (
+        df[df["Country"].notna()]["Country"].unique().tolist() + df[df["City"].notna()]["City"].unique().tolist()
+    )
+    return sorted(locations)
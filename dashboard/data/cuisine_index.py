@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+CUISINE_SEPARATOR = ", "
+
+
+def build_cuisine_index(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Build an inverted index of the 'Cuisine' column.
+
+    A restaurant can serve multiple cuisines (e.g. "Japanese, Sushi"), so the column is split into tokens first.
+
+    Args:
+        df (pd.DataFrame): dataset including the column 'Cuisine'
+
+    Returns:
+        dict[str, np.ndarray]: cuisine token mapped to the sorted row positions of the restaurants serving it
+    """
+    # Use a positional index, so the index holds row positions regardless of the index of the frame
+    cuisines = pd.Series(df["Cuisine"].to_numpy())
+    tokens = cuisines.str.split(CUISINE_SEPARATOR).explode().dropna()
+    positions = tokens.index.to_numpy()
+    return {token: positions[indices] for token, indices in tokens.groupby(tokens).indices.items()}
+
+
+def cuisine_options(index: dict[str, np.ndarray]) -> list[str]:
+    """Get the sorted cuisine tokens to be used as options."""
+    return sorted(index)
+
+
+def filter_by_cuisine(df: pd.DataFrame, index: dict[str, np.ndarray], cuisine: str) -> pd.DataFrame:
+    """Get all restaurants serving a cuisine, including restaurants serving multiple cuisines."""
+    return df.iloc[index.get(cuisine, np.empty(0, dtype=np.intp))]
@@ -1,12 +1,144 @@
+import os
+import re
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import pandas as pd
-from langchain_community.utilities import SQLDatabase
 from loguru import logger
-from sqlalchemy import create_engine
+from sqlalchemy import Connection, create_engine, event, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
 
+from dashboard.data.cuisine_index import CUISINE_SEPARATOR
 from dashboard.singleton import SingletonMeta
 
+if TYPE_CHECKING:
+    from langchain_community.utilities import SQLDatabase
+
+# Guardrails for the queries of the SQL agent
+MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", 50))  # Rows returned per query
+STATEMENT_TIMEOUT = float(os.getenv("SQL_STATEMENT_TIMEOUT", 5))  # seconds
+
+# Number of values listed per column in the schema digest
+DIGEST_TOP_VALUES = 15
+
+# Table holding the version of the dataset which is loaded into the database
+META_TABLE = "meta"
+
+# Indexed columns of the michelin table
+INDEXES = [["Country", "Award"], ["City"], ["Award"], ["Name", "Location"]]
+
+# Summary tables for common questions, which are tiny compared to the michelin table
+SUMMARY_TABLES = {
+    "award_by_country": "number of restaurants (count) per Country and Award",
+    "award_by_cuisine": "number of restaurants (count) per single Cuisine and Award",
+    "price_by_city": 'number of restaurants (count) per Country, City and "Price (normalized)"',
+    "restaurant_cuisines": "one row per Name, Location and Cuisine, to find restaurants serving a cuisine",
+}
+
+LEADING_COMMENTS = re.compile(r"^(\s*(--[^\n]*(\n|$)|/\*.*?\*/))*\s*", re.DOTALL)
+# The semicolon ending a statement, which may be followed by comments
+TRAILING_SEMICOLON = re.compile(r";(\s*(--[^\n]*|/\*.*?\*/))*\s*$", re.DOTALL)
+
+
+class QueryRejectedError(SQLAlchemyError):
+    """Raised when a query of the agent is too expensive to run.
+
+    This is a SQLAlchemyError, so the agent receives the message and can rewrite its query.
+    """
+
+
+def quadratic_scan(plan: list) -> str | None:
+    """Detect full table scans which are repeated for every row of another full table scan.
+
+    Args:
+        plan (list): rows (id, parent, notused, detail) of EXPLAIN QUERY PLAN
+
+    Returns:
+        str | None: reason if the plan contains such a scan, otherwise None
+    """
+    details = {row[0]: row[-1] for row in plan}
+    # Full table scans are reported as e.g. "SCAN michelin", scans of an index mention the index
+    full_scans = [
+        row for row in plan if row[-1].startswith("SCAN ") and "INDEX" not in row[-1] and "CONSTANT" not in row[-1]
+    ]
+
+    scans_per_parent = {}
+    for _, parent, _, detail in full_scans:
+        # A full scan inside a correlated subquery runs for every row of the outer query
+        if details.get(parent, "").startswith("CORRELATED"):
+            return f"{detail} in a correlated subquery"
+        scans_per_parent.setdefault(parent, []).append(detail)
+
+    for scans in scans_per_parent.values():
+        # Full scans in the same SELECT are joined using nested loops
+        if len(scans) > 1:
+            return f"nested loop over {', '.join(scans)}"
+    return None
+
+
+def build_summary_tables(df: pd.DataFrame) -> dict[str, tuple[pd.DataFrame, list[str]]]:
+    """Build the summary tables.
+
+    Returns:
+        dict[str, tuple[pd.DataFrame, list[str]]]: data and indexed columns per summary table
+    """
+    cuisines = df[["Name", "Location", "Cuisine", "Award"]].assign(Cuisine=df["Cuisine"].str.split(CUISINE_SEPARATOR))
+    cuisines = cuisines.explode("Cuisine").dropna(subset="Cuisine")
+
+    def count(data: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+        return data.groupby(columns).size().reset_index(name="count")
+
+    return {
+        "award_by_country": (count(df, ["Country", "Award"]), ["Country", "Award"]),
+        "award_by_cuisine": (count(cuisines, ["Cuisine", "Award"]), ["Cuisine", "Award"]),
+        "price_by_city": (count(df, ["Country", "City", "Price (normalized)"]), ["City"]),
+        "restaurant_cuisines": (cuisines[["Name", "Location", "Cuisine"]], ["Cuisine"]),
+    }
+
+
+def enable_transactional_ddl(engine) -> None:
+    """Include statements changing the schema (e.g. DROP TABLE) in transactions.
+
+    pysqlite only begins a transaction before modifying rows, so it commits schema changes right away. Instead, the
+    transactions are begun by SQLAlchemy, see the "Serializable isolation / Savepoints / Transactional DDL" section of
+    the SQLite dialect of SQLAlchemy.
+    """
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+def set_statement_timeout(engine) -> None:
+    """Interrupt SQLite statements which run longer than their 'statement_timeout' execution option."""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        state = connection_record.info["statement"] = {"deadline": None}
+
+        def progress_handler() -> int:
+            # A non-zero return value interrupts the running statement
+            return int(state["deadline"] is not None and time.monotonic() > state["deadline"])
+
+        dbapi_connection.set_progress_handler(progress_handler, 10_000)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        timeout = context.execution_options.get("statement_timeout")
+        connection.info["statement"]["deadline"] = time.monotonic() + timeout if timeout else None
+
+    # SQLite computes the rows of a statement while they are fetched, which happens after the statement is executed.
+    # So the deadline is kept until the connection is returned to the pool.
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        if connection_record is not None and "statement" in connection_record.info:
+            connection_record.info["statement"]["deadline"] = None
+
 
 class Database(metaclass=SingletonMeta):
     """Provide CSV data as a SQLite database."""
@@ -15,21 +147,139 @@ class Database(metaclass=SingletonMeta):
 
     def __init__(self):
         logger.debug("Database object is being created..")
+        self.engine = None
         self.db = None
 
-    def load(self, df: pd.DataFrame) -> None:
-        database_exists = self.DB_FILE.is_file()
+    def load(self, df: pd.DataFrame, version: str | None = None) -> None:
+        """Load a dataset into the database, unless the database already holds that version of the dataset.
 
-        engine = create_engine(f"sqlite:///{self.DB_FILE}")
+        Args:
+            df (pd.DataFrame): dataset
+            version (str | None): version of the dataset, None for datasets which are not loaded from the partitions
+                (e.g. synthetic datasets), which are always loaded
+        """
+        if self.engine:
+            self.engine.dispose()
+        self.engine = create_engine(f"sqlite:///{self.DB_FILE}")
+        enable_transactional_ddl(self.engine)
+        set_statement_timeout(self.engine)
 
-        # Load data into database if the database did not exists
-        if not database_exists:
-            df.to_sql("michelin", engine, index=False)
+        if version is None or version != self.stored_version():
+            self.rebuild(df, version)
 
-        self.db = SQLDatabase(engine=engine)
+        self.db = None
+        self.load_schema_digest(version)
 
-    def get_db(self) -> SQLDatabase:
-        """Return instance of SQLDatabase."""
-        if not self.db:
+    def stored_version(self) -> str | None:
+        """Get the version of the dataset held by the database, None if unknown."""
+        if META_TABLE not in inspect(self.engine).get_table_names():
+            return None
+        with self.engine.connect() as connection:
+            return connection.execute(text(f"SELECT value FROM {META_TABLE} WHERE key = 'version'")).scalar()
+
+    def rebuild(self, df: pd.DataFrame, version: str | None) -> None:
+        """Replace the michelin table and the summary tables in a single transaction.
+
+        The tables always hold the same version of the dataset, also while they are replaced or when replacing them
+        fails.
+        """
+        logger.info(f"Loading dataset {version} into the database..")
+        with self.engine.begin() as connection:
+            for name in ["michelin", *SUMMARY_TABLES]:
+                connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+            df.to_sql("michelin", connection, index=False)
+            self.create_indexes(connection)
+            self.create_summary_tables(connection, df)
+
+            connection.execute(text(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)"))
+            connection.execute(
+                text(f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES ('version', :version)"),
+                {"version": version},
+            )
+
+    @staticmethod
+    def create_indexes(connection: Connection) -> None:
+        """Create the indexes of the michelin table."""
+        for columns in INDEXES:
+            name = "ix_michelin_" + "_".join(column.lower() for column in columns)
+            quoted_columns = ", ".join(f'"{column}"' for column in columns)
+            connection.execute(text(f"CREATE INDEX {name} ON michelin ({quoted_columns})"))
+
+    @staticmethod
+    def create_summary_tables(connection: Connection, df: pd.DataFrame) -> None:
+        """Create the summary tables and their indexes."""
+        for name, (data, index_columns) in build_summary_tables(df).items():
+            data.to_sql(name, connection, index=False)
+            quoted_columns = ", ".join(f'"{column}"' for column in index_columns)
+            connection.execute(text(f"CREATE INDEX ix_{name} ON {name} ({quoted_columns})"))
+
+    def load_schema_digest(self, version: str | None) -> str:
+        """Load the schema digest of a version of the dataset, which is built once per version.
+
+        Args:
+            version (str | None): version of the dataset held by the database, the digest of datasets without a version
+                is not stored
+        """
+        if version is None:
+            return self.build_schema_digest()
+
+        path = self.DB_FILE.with_name(f"{self.DB_FILE.stem}.{version}.digest.txt")
+        if path.is_file():
+            return path.read_text()
+
+        digest = self.build_schema_digest()
+        # Write to a temporary file first, so a concurrent reader never sees a partial digest
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(digest)
+        tmp_path.replace(path)
+        for previous in path.parent.glob(f"{self.DB_FILE.stem}.*.digest.txt"):
+            if previous != path:
+                previous.unlink(missing_ok=True)
+        return digest
+
+    def build_schema_digest(self) -> str:
+        """Describe the columns and most common values of the database.
+
+        By providing this digest to the agent, the agent does not have to look up the schema and values itself.
+        """
+        with self.engine.connect() as connection:
+
+            def values(column: str, distinct: bool = False) -> str:
+                rows = connection.execute(
+                    text(
+                        f'SELECT "{column}", COUNT(*) AS count FROM michelin WHERE "{column}" IS NOT NULL '
+                        f'GROUP BY "{column}" ORDER BY {"1" if distinct else "count DESC"} LIMIT {DIGEST_TOP_VALUES}'
+                    )
+                ).fetchall()
+                return ", ".join(f"'{value}'" for value, _ in rows)
+
+            columns = connection.execute(text("PRAGMA table_info(michelin)")).fetchall()
+            lines = ['Table "michelin" contains one row per restaurant, with the columns:']
+            lines += [f'- "{column[1]}" ({column[2]})' for column in columns]
+            lines += [
+                "",
+                f'All values of "Award": {values("Award", distinct=True)}',
+                f'All values of "Price (normalized)": {values("Price (normalized)", distinct=True)}',
+                f'Most common values of "Country": {values("Country")}',
+                f'Most common values of "Cuisine" (a restaurant can have multiple cuisines): {values("Cuisine")}',
+                "",
+                "Prefer these small summary tables (with the same values) to answer questions about counts:",
+            ]
+            lines += [f'- "{name}": {description}' for name, description in SUMMARY_TABLES.items()]
+        return "\n".join(lines)
+
+    def reset_connections(self) -> None:
+        """Drop pooled connections inherited from a parent process, without closing them for the parent."""
+        if self.engine:
+            self.engine.dispose(close=False)
+
+    def get_db(self) -> "SQLDatabase":
+        """Return instance of SQLDatabase, which is created on first use as it imports langchain."""
+        if not self.engine:
             raise AttributeError("Database has not been initialized yet.")
+        if not self.db:
+            from dashboard.data.guarded_database import GuardedSQLDatabase
+
+            self.db = GuardedSQLDatabase(engine=self.engine, ignore_tables=[META_TABLE])
         return self.db
@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from dashboard.data.loader import PARTITION_DIR, load_editions, partition_path
+
+# Columns identifying a restaurant across editions
+KEY_COLUMNS = ["Name", "Location"]
+
+MOVEMENTS_ORDERED = ["Promoted", "Demoted", "New", "Dropped", "Unchanged"]
+
+
+def award_movement(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """Compare the awards of two editions.
+
+    Restaurants sharing a name and location within an edition cannot be told apart, only the first one is compared.
+
+    Args:
+        previous (pd.DataFrame): data of the older edition
+        current (pd.DataFrame): data of the newer edition
+
+    Returns:
+        pd.DataFrame: one row per restaurant with the award in both editions and the 'Movement' between them
+    """
+    columns = KEY_COLUMNS + ["Country", "Award", "Award Score"]
+    df = pd.merge(
+        unique_restaurants(previous[columns], "previous"),
+        unique_restaurants(current[columns], "current"),
+        on=KEY_COLUMNS,
+        how="outer",
+        suffixes=(" (previous)", " (current)"),
+        validate="one_to_one",
+    )
+    df["Country"] = df["Country (current)"].fillna(df["Country (previous)"])
+
+    previous_score = df["Award Score (previous)"]
+    current_score = df["Award Score (current)"]
+    df["Movement"] = np.select(
+        [
+            previous_score.isna(),
+            current_score.isna(),
+            current_score > previous_score,
+            current_score < previous_score,
+        ],
+        ["New", "Dropped", "Promoted", "Demoted"],
+        default="Unchanged",
+    )
+
+    return df[KEY_COLUMNS + ["Country", "Award (previous)", "Award (current)", "Movement"]]
+
+
+def unique_restaurants(df: pd.DataFrame, edition: str) -> pd.DataFrame:
+    """Drop the restaurants of an edition whose key is not unique, keeping the first one."""
+    duplicated = df.duplicated(KEY_COLUMNS)
+    if duplicated.any():
+        names = ", ".join(df.loc[duplicated, "Name"] + " (" + df.loc[duplicated, "Location"] + ")")
+        logger.warning(f"Dropped {duplicated.sum()} duplicate restaurants of the {edition} edition: {names}")
+    return df[~duplicated]
+
+
+def movement_path(previous: int, current: int) -> Path:
+    """Get the path of the precomputed award movement between two editions."""
+    return PARTITION_DIR / f"movement_{previous}_{current}.pkl"
+
+
+def load_award_movement(previous: int, current: int) -> pd.DataFrame:
+    """Load the award movement between two editions.
+
+    The movement is computed once and stored next to the partitions, so pages never join full editions.
+    It is recomputed when one of the partitions is newer than the stored movement.
+    """
+    path = movement_path(previous, current)
+
+    if path.is_file() and all(
+        path.stat().st_mtime >= partition_path(edition).stat().st_mtime
+        for edition in (previous, current)
+        if partition_path(edition).is_file()
+    ):
+        return pd.read_pickle(path)
+
+    logger.info(f"Computing award movement between {previous} and {current}..")
+    editions = load_editions([previous, current])
+    df = award_movement(editions[previous], editions[current])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_pickle(path)
+    return df
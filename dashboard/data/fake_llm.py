@@ -0,0 +1,79 @@
+import json
+import os
+import re
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Queries replayed by default, similar to the queries the agent runs for the recommended prompts
+DEFAULT_QUERIES = [
+    "SELECT COUNT(*) FROM michelin WHERE Country = 'France' AND Award = '3 Stars'",
+    "SELECT Cuisine, COUNT(*) AS count FROM michelin WHERE Award = '3 Stars' GROUP BY Cuisine ORDER BY count DESC "
+    "LIMIT 5",
+]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Local chat model which replays a script of SQL queries, for deterministic (offline) performance tests.
+
+    Every call of the model returns the next query of the script as a call of the `sql_db_query` tool. Once all
+    queries have been run, the result of the last query is returned as the final answer.
+    """
+
+    queries: list[str] = DEFAULT_QUERIES
+    latency: float = 0.0  # Seconds per call of the model, to simulate the latency of a remote model
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+
+        # Every tool call of the agent results in a tool message, so these tell how far the script is
+        tool_messages = [message for message in messages if isinstance(message, ToolMessage)]
+        step = len(tool_messages)
+
+        if step < len(self.queries):
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": "sql_db_query", "args": {"query": self.queries[step]}, "id": f"call_{step}"}],
+            )
+        else:
+            result = tool_messages[-1].content if tool_messages else "-"
+            message = AIMessage(content=f"The result of the query is: {result}")
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages: list[BaseMessage], stop: list[str] | None = None, **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        """Stream the message of `_generate`, with the final answer split into words."""
+        message = self._generate(messages, stop, **kwargs).generations[0].message
+        if message.tool_calls:
+            tool_call_chunks = [
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=tool_call_chunks))
+            return
+
+        for word in re.findall(r"\S+\s*", message.content):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+def create_scripted_chat_model() -> ScriptedChatModel:
+    """Create a scripted chat model, configured using environment variables.
+
+    FAKE_LLM_LATENCY: seconds per call of the model
+    FAKE_LLM_SCRIPT: path of a JSON file with the list of queries to replay
+    """
+    kwargs = {"latency": float(os.getenv("FAKE_LLM_LATENCY", 0))}
+    if script := os.getenv("FAKE_LLM_SCRIPT"):
+        kwargs["queries"] = json.loads(Path(script).read_text())
+    return ScriptedChatModel(**kwargs)
@@ -0,0 +1,46 @@
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import text
+
+from dashboard.data.database import (
+    LEADING_COMMENTS,
+    MAX_ROWS,
+    STATEMENT_TIMEOUT,
+    TRAILING_SEMICOLON,
+    QueryRejectedError,
+    quadratic_scan,
+)
+
+
+class GuardedSQLDatabase(SQLDatabase):
+    """SQLDatabase which bounds the cost of the queries written by the agent."""
+
+    def run(self, command, fetch="all", include_columns=False, *, parameters=None, execution_options=None):
+        if isinstance(command, str):
+            command = self.guard(command)
+        execution_options = {**(execution_options or {}), "statement_timeout": STATEMENT_TIMEOUT}
+        return super().run(command, fetch, include_columns, parameters=parameters, execution_options=execution_options)
+
+    def guard(self, command: str) -> str:
+        """Reject queries with a quadratic number of rows scanned, and limit the number of rows of queries.
+
+        The query is wrapped in a query with a LIMIT, so the LIMIT applies to queries with a larger LIMIT of their own,
+        and can not be disabled by a trailing comment.
+
+        Raises:
+            QueryRejectedError: if the query repeatedly scans a full table
+        """
+        command = TRAILING_SEMICOLON.sub("", command.strip())
+        if not LEADING_COMMENTS.sub("", command, count=1).lower().startswith(("select", "with")):
+            return command
+
+        with self._engine.connect() as connection:
+            plan = connection.execute(text(f"EXPLAIN QUERY PLAN {command}")).fetchall()
+
+        if reason := quadratic_scan(plan):
+            raise QueryRejectedError(
+                f"Query rejected: {reason}. Rewrite the query to scan the table only once, for example by using "
+                "GROUP BY instead of joins or correlated subqueries."
+            )
+
+        # The query is placed on its own lines, which ends a trailing line comment
+        return f"SELECT * FROM (\n{command}\n) LIMIT {MAX_ROWS}"
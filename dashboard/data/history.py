@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from dashboard.singleton import SingletonMeta
+
+HISTORY_FILE = Path("cache/history.sqlite")
+
+# Bounds of the history, the oldest entries are removed when exceeded
+MAX_ENTRIES = int(os.getenv("LLM_HISTORY_MAX_ENTRIES", 100))  # per session
+MAX_AGE = float(os.getenv("LLM_HISTORY_MAX_AGE", 30 * 24 * 60 * 60))  # seconds, for all sessions
+
+PAGE_SIZE = 10  # Entries which are sent to the browser at once
+CONTEXT_ENTRIES = 3  # Previous answers which are provided to the LLM as context
+
+
+class History(metaclass=SingletonMeta):
+    """Questions and answers of the LLM analysis page, stored per session in SQLite.
+
+    The history is kept on the server, so the browser only receives the entries it displays. It is stored separately
+    from the database of the agent, so the agent can not query the questions of other sessions.
+    """
+
+    def __init__(self, path: Path = HISTORY_FILE) -> None:
+        logger.debug("History object is being created..")
+        self.path = path
+        self._local = threading.local()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT NOT NULL, "
+                "asked REAL NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_history_session ON history (session, id)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_history_asked ON history (asked)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread, connections are not reused by a forked process."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.pid = os.getpid()
+        return connection
+
+    def add(self, session: str, question: str, answer: str) -> dict:
+        """Add an entry to the history of a session.
+
+        Returns:
+            dict: the new entry
+        """
+        asked = time.time()
+        with self._connection() as connection:
+            cursor = connection.execute(
+                "INSERT INTO history (session, asked, question, answer) VALUES (?, ?, ?, ?)",
+                (session, asked, question, answer),
+            )
+            entry_id = cursor.lastrowid
+            self._prune(connection, session, asked)
+        return {"id": entry_id, "session": session, "asked": asked, "question": question, "answer": answer}
+
+    def _prune(self, connection: sqlite3.Connection, session: str, now: float) -> None:
+        """Remove the entries exceeding the bounds of the history."""
+        connection.execute("DELETE FROM history WHERE asked < ?", (now - MAX_AGE,))
+        connection.execute(
+            "DELETE FROM history WHERE session = ? AND id <= "
+            "(SELECT id FROM history WHERE session = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (session, session, MAX_ENTRIES),
+        )
+
+    def page(self, session: str, before: int | None = None, limit: int = PAGE_SIZE) -> list[dict]:
+        """Get the most recent entries of a session.
+
+        Args:
+            session (str): id of the session
+            before (int | None): only get entries older than the entry with this id, to get the next page
+            limit (int): maximum number of entries
+
+        Returns:
+            list[dict]: entries, oldest first
+        """
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT * FROM history WHERE session = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (session, before if before is not None else 2**63 - 1, limit),
+            )
+            .fetchall()
+        )
+        return [dict(row) for row in reversed(rows)]
+
+    def context(self, session: str, limit: int = CONTEXT_ENTRIES) -> str | None:
+        """Format the most recent entries of a session as context for a prompt."""
+        entries = self.page(session, limit=limit)
+        if not entries:
+            return None
+        return "\n\n".join(f"Question: {entry['question']}\nAnswer: {entry['answer']}" for entry in entries)
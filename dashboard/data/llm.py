@@ -1,12 +1,162 @@
-from langchain_community.agent_toolkits import create_sql_agent
-from langchain_openai import ChatOpenAI
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from loguru import logger
 
 from dashboard.data.database import Database
 from dashboard.singleton import SingletonMeta
 
+# langchain (and openai) take over a second to import, so these are only imported once the LLM is used
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, only the per-process budget is applied
+    fcntl = None
+
 OPENAI_MODEL = "gpt-3.5-turbo"
 
+# Model used by the agent: "openai", or "fake" for a local model replaying scripted queries (see fake_llm.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+
+def create_chat_model() -> "BaseChatModel":
+    """Create the chat model of the configured backend."""
+    if LLM_BACKEND == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model=OPENAI_MODEL)
+    if LLM_BACKEND == "fake":
+        from dashboard.data.fake_llm import create_scripted_chat_model
+
+        return create_scripted_chat_model()
+    raise ValueError(f"Unknown LLM backend: {LLM_BACKEND}")
+
+
+# Concurrency budget of LLM invocations, a queued invocation still occupies a (gunicorn) thread
+MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", 1))  # per process
+MAX_CONCURRENT_GLOBAL = int(os.getenv("LLM_MAX_CONCURRENT_GLOBAL", 2))  # across all processes
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 2))  # per process
+QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 30))  # seconds
+
+# Budget per invocation of the agent, the agent stops and answers with what it has when exceeded
+MAX_ITERATIONS = int(os.getenv("LLM_MAX_ITERATIONS", 8))
+MAX_EXECUTION_TIME = float(os.getenv("LLM_MAX_EXECUTION_TIME", 60))  # seconds
+
+# Lower values are scheduled first
+PRIORITY_ANALYSIS = 0
+PRIORITY_RECOMMENDATIONS = 1
+
+
+class LLMBusyError(Exception):
+    """Raised when the LLM is too busy to handle an invocation."""
+
+
+class LLMScheduler:
+    """Limit the number of concurrent LLM invocations, so a burst of questions can not occupy all threads.
+
+    Invocations wait in a bounded queue (ordered by priority) for a slot of this process. Afterwards a slot shared
+    by all processes is claimed by locking one of the slot files.
+    """
+
+    SLOT_DIR = Path("cache/llm-slots")
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT,
+        max_concurrent_global: int = MAX_CONCURRENT_GLOBAL,
+        max_queue: int = MAX_QUEUE,
+        timeout: float = QUEUE_TIMEOUT,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_concurrent_global = max_concurrent_global
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.running = 0
+        self.queue = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, priority: int):
+        """Wait for a slot to invoke the LLM.
+
+        Raises:
+            LLMBusyError: if the queue is full or no slot became available before the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        self._acquire(priority, deadline)
+        try:
+            with self._global_slot(deadline):
+                yield
+        finally:
+            with self.condition:
+                self.running -= 1
+                self.condition.notify_all()
+
+    def _acquire(self, priority: int, deadline: float) -> None:
+        with self.condition:
+            if self.running >= self.max_concurrent and len(self.queue) >= self.max_queue:
+                raise LLMBusyError("The queue of LLM invocations is full.")
+
+            ticket = (priority, next(self.counter))
+            heapq.heappush(self.queue, ticket)
+            try:
+                while self.running >= self.max_concurrent or self.queue[0] != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LLMBusyError("Timed out waiting for the LLM.")
+                    self.condition.wait(remaining)
+            except LLMBusyError:
+                self.queue.remove(ticket)
+                heapq.heapify(self.queue)
+                self.condition.notify_all()
+                raise
+
+            heapq.heappop(self.queue)
+            self.running += 1
+            # The next ticket in the queue may be able to run as well
+            self.condition.notify_all()
+
+    @contextmanager
+    def _global_slot(self, deadline: float):
+        if fcntl is None:
+            yield
+            return
+
+        self.SLOT_DIR.mkdir(parents=True, exist_ok=True)
+        while True:
+            for i in range(self.max_concurrent_global):
+                file = open(self.SLOT_DIR / f"{i}.lock", "w")
+                try:
+                    fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    file.close()
+                    continue
+
+                # Closing the file releases the lock
+                with file:
+                    yield
+                return
+
+            if time.monotonic() >= deadline:
+                raise LLMBusyError("Timed out waiting for the LLM.")
+            time.sleep(0.1)
+
+
+def api_key_missing() -> bool:
+    """Whether the configured backend needs an OpenAI API key which is not provided."""
+    return LLM_BACKEND == "openai" and not os.getenv("OPENAI_API_KEY")
+
 
 class LLM(metaclass=SingletonMeta):
     ANALYSIS_PROMPT = """
@@ -33,16 +183,78 @@ class LLM(metaclass=SingletonMeta):
     {}
     """
 
+    SCHEMA_PROMPT = """
+    The database is described below. Use the exact values listed when filtering on these columns.
+
+    {}
+    """
+
+    CONTEXT_PROMPT = """
+    The user asked the following questions before, which the query may refer to:
+
+    {}
+    """
+
+    SCHEMA_SUFFIX = "The schema of the database is described above, so I can write the query right away."
+
     def __init__(self) -> None:
         logger.debug("LLM object is being created..")
-        db = Database().get_db()
-        llm = ChatOpenAI(model=OPENAI_MODEL)
-        self.agent_executor = create_sql_agent(llm, db=db, agent_type="openai-tools", verbose=True)
+        self.llm = create_chat_model()
+        self.agent_executor = None
+        self.version = None  # Version of the dataset described by the prompt of the agent
+        self.lock = threading.Lock()
+        self.get_agent()
+        self.scheduler = LLMScheduler()
+
+    def get_agent(self) -> "AgentExecutor":
+        """Get the SQL agent, which is rebuilt when the database holds another version of the dataset.
+
+        The prompt of the agent describes the values of the dataset, so the agent is rebuilt once the dataset has been
+        refreshed (possibly by another process).
+        """
+        database = Database()
+        version = database.stored_version()
+        if self.agent_executor is not None and version == self.version:
+            return self.agent_executor
+
+        with self.lock:
+            if self.agent_executor is None or version != self.version:
+                from langchain_community.agent_toolkits import create_sql_agent
+                from langchain_community.agent_toolkits.sql.prompt import SQL_PREFIX
+
+                logger.info(f"Building the SQL agent for dataset {version}..")
+                # Provide the schema up front, so the agent can skip looking up the tables and their values
+                digest = database.load_schema_digest(version).replace("{", "{{").replace("}", "}}")
+                self.agent_executor = create_sql_agent(
+                    self.llm,
+                    db=database.get_db(),
+                    agent_type="openai-tools",
+                    prefix=SQL_PREFIX + self.SCHEMA_PROMPT.format(digest),
+                    suffix=self.SCHEMA_SUFFIX,
+                    max_iterations=MAX_ITERATIONS,
+                    max_execution_time=MAX_EXECUTION_TIME,
+                    verbose=True,
+                )
+                self.version = version
+            return self.agent_executor
 
-    def invoke_analysis_llm(self, prompt: str) -> str:
-        """Invoke the LLM with a given prompt."""
+    def invoke_analysis_llm(
+        self, prompt: str, context: str | None = None, callbacks: "list[BaseCallbackHandler] | None" = None
+    ) -> str:
+        """Invoke the LLM with a given prompt.
+
+        Args:
+            prompt (str): question of the user
+            context (str | None): previous questions and answers of the user, which the question may refer to
+            callbacks (list[BaseCallbackHandler] | None): handlers of the progress of the agent, e.g. to stream the
+                answer
+        """
         input_str = self.ANALYSIS_PROMPT.format(prompt)
-        response = self.agent_executor.invoke({"input": input_str})
+        if context:
+            input_str = self.CONTEXT_PROMPT.format(context) + input_str
+        agent_executor = self.get_agent()
+        with self.scheduler.slot(PRIORITY_ANALYSIS):
+            response = agent_executor.invoke({"input": input_str}, config={"callbacks": callbacks})
         return response["output"]
 
     def invoke_recommendations_llm(
@@ -52,8 +264,14 @@ class LLM(metaclass=SingletonMeta):
         price_range: list,
         award_range: list,
         description_of_restaurant: str,
+        candidates: str | None = None,
+        callbacks: "list[BaseCallbackHandler] | None" = None,
     ) -> str:
-        """Invoke the LLM to make a recommendation using the SQL agent."""
+        """Invoke the LLM to make a recommendation using the SQL agent.
+
+        Candidates are restaurants matching the preferences, found by the local search, which the agent can start
+        from instead of searching the description in the database itself. See `invoke_analysis_llm` for the callbacks.
+        """
         input_str = f"""
         You are a helpful assistant recommending restaurants based on user preferences.
         Use the connected database to recommend a restaurant based on the following user preferences.
@@ -69,11 +287,17 @@ class LLM(metaclass=SingletonMeta):
             description_of_restaurant if description_of_restaurant else "No specific description"
         }
 
+        Restaurants which match the preferences above, and whose description best matches the description of the
+        desired restaurant:
+        {candidates if candidates else "No matching restaurants"}
+
         Make sure that the that the results includes the restaurant's name, location, cuisine, price range, awards,
         and a brief explanation of why it fits the user's preferences.
         Ensure your response feels conversational and helpful, as if you are directly speaking to the user about your
         recommendation.
         """
         print(input_str)
-        response = self.agent_executor.invoke({"input": input_str})
+        agent_executor = self.get_agent()
+        with self.scheduler.slot(PRIORITY_RECOMMENDATIONS):
+            response = agent_executor.invoke({"input": input_str}, config={"callbacks": callbacks})
         return response["output"]
@@ -1,49 +1,126 @@
+import re
 import urllib.request
 from pathlib import Path
 
 import pandas as pd
 from loguru import logger
 
-URL = "https://raw.githubusercontent.com/plotly/datasets/master/michelin_by_Jerry_Ng.csv"
-CACHE_FILE = "cache/michelin_data.csv"
+# Source CSV per Michelin Guide edition (year). Add an entry here to track a new edition, or place the source CSV of
+# the edition in the cache directory (see `source_path`).
+EDITIONS = {
+    2024: "https://raw.githubusercontent.com/plotly/datasets/master/michelin_by_Jerry_Ng.csv",
+}
+CURRENT_EDITION = max(EDITIONS)
 
+CACHE_DIR = Path("cache")
+PARTITION_DIR = CACHE_DIR / "editions"
 
-def load_data() -> pd.DataFrame:
-    """Load data.
 
-    The data is either retrieved from cache, or fetched from Github if not found in cache.
+def load_data(edition: int = CURRENT_EDITION) -> pd.DataFrame:
+    """Load data of a single edition.
+
+    The data is read from the partition of the edition, which is built from the source CSV if not found in cache.
+
+    Args:
+        edition (int): year of the Michelin Guide edition
 
     Returns:
-        pd.DataFrame: CSV data as a pandas DataFrame
+        pd.DataFrame: cleaned data (including features) as a pandas DataFrame
     """
-    path = Path(CACHE_FILE)
+    path = partition_path(edition)
 
     if not path.is_file():
-        logger.info("Fetching data from source..")
-        fetch_data(path)
+        build_partition(edition)
     else:
-        logger.info("Loading data from cache..")
+        logger.info(f"Loading edition {edition} from cache..")
+
+    return pd.read_pickle(path)
+
+
+def load_editions(editions: list[int]) -> dict[int, pd.DataFrame]:
+    """Load the requested editions, only reading the partitions of those editions."""
+    return {edition: load_data(edition) for edition in editions}
+
+
+def available_editions() -> list[int]:
+    """Get all known editions, oldest first.
+
+    An edition is known when it has a source URL, or when its source CSV was placed in the cache directory.
+    """
+    local = {
+        int(match.group(1))
+        for path in CACHE_DIR.glob("michelin_data_*.csv")
+        if (match := re.fullmatch(r"michelin_data_(\d{4})\.csv", path.name))
+    }
+    return sorted(set(EDITIONS) | local)
+
+
+def dataset_version(edition: int = CURRENT_EDITION) -> str:
+    """Get the version of the data of an edition.
+
+    The version changes whenever the partition is rebuilt, so it can be used to key anything derived from the data.
+    """
+    path = partition_path(edition)
+    if not path.is_file():
+        build_partition(edition)
+    return f"{edition}-{path.stat().st_mtime_ns}"
 
-    df = pd.read_csv(path)
+
+def partition_path(edition: int) -> Path:
+    """Get the path of the partition holding the prepared data of an edition."""
+    if edition not in available_editions():
+        raise ValueError(f"Unknown edition: {edition}")
+    return PARTITION_DIR / f"{edition}.pkl"
+
+
+def source_path(edition: int) -> Path:
+    """Get the path of the source CSV of an edition, which is fetched there if it has a source URL."""
+    return CACHE_DIR / f"michelin_data_{edition}.csv"
+
+
+def build_partition(edition: int) -> Path:
+    """Build the partition of an edition from its source CSV.
+
+    Args:
+        edition (int): year of the Michelin Guide edition
+
+    Returns:
+        Path: path of the written partition
+    """
+    source = source_path(edition)
+
+    if not source.is_file():
+        logger.info(f"Fetching edition {edition} from source..")
+        fetch_data(EDITIONS[edition], source)
+
+    df = pd.read_csv(source)
 
     df = clean_data(df)
 
     df = add_features(df)
 
-    logger.info("Loading data into SQLite database..")
+    path = partition_path(edition)
+    path.parent.mkdir(parents=True, exist_ok=True)
 
-    return df
+    # Write to a temporary file first, so a concurrent reader never sees a partial partition
+    tmp_path = path.with_suffix(".tmp")
+    df.to_pickle(tmp_path)
+    tmp_path.replace(path)
+
+    logger.info(f"Stored edition {edition} in {path}")
+    return path
 
 
-def fetch_data(path: Path) -> None:
+def fetch_data(url: str, path: Path) -> None:
     """Fetches data from URL and stores the data in the cache file.
 
     Args:
-        cache_path (Path): path to store the fetched data
+        url (str): URL of the source CSV
+        path (Path): path to store the fetched data
     """
     logger.info("Fetching data..")
     path.parent.mkdir(parents=True, exist_ok=True)
-    urllib.request.urlretrieve(URL, path)
+    urllib.request.urlretrieve(url, path)
 
 
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
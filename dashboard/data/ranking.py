@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# Weights of the components of the value score. With the default weights, restaurants are ranked like the 'Value'
+# feature (Award Score / Price Score).
+DEFAULT_WEIGHTS = {
+    "award": 1.0,  # Higher awards are better
+    "price": 1.0,  # Lower prices are better
+    "green_star": 0.0,  # Bonus for a Green Star
+    "locality": 0.0,  # Bonus for awards above the average of the city
+}
+
+# Number of restaurants which are precomputed per country and city
+TOP_K = 50
+
+RANKING_COLUMNS = ["Name", "Location", "Cuisine", "Price", "Award", "Value"]
+
+
+def value_scores(df: pd.DataFrame, weights: dict[str, float] = DEFAULT_WEIGHTS) -> np.ndarray:
+    """Compute the value score of every restaurant.
+
+    The award and price are compared on a logarithmic scale, so with equal weights the score is the logarithm of
+    'Value'. Restaurants without a price or award get a score of -inf.
+
+    Args:
+        df (pd.DataFrame): dataset (including the columns 'Award Score' and 'Price Score')
+        weights (dict[str, float]): weights of the components, see DEFAULT_WEIGHTS
+
+    Returns:
+        np.ndarray: score per restaurant, higher is better
+    """
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown weights: {', '.join(sorted(unknown))}")
+    weights = {**DEFAULT_WEIGHTS, **weights}
+
+    award_score = df["Award Score"].to_numpy(dtype=float)
+    price_score = df["Price Score"].to_numpy(dtype=float)
+    scores = weights["award"] * np.log(award_score) - weights["price"] * np.log(price_score)
+
+    if weights["green_star"]:
+        scores += weights["green_star"] * df["GreenStar"].to_numpy(dtype=float)
+    if weights["locality"]:
+        city_average = df.groupby("City", dropna=False)["Award Score"].transform("mean").to_numpy(dtype=float)
+        scores += weights["locality"] * (award_score - city_average)
+
+    return np.where(np.isnan(scores), -np.inf, scores)
+
+
+class Ranking:
+    """Restaurants ranked by value, with the top restaurants of every country and city precomputed.
+
+    Queries for the best value in a country or city are answered by a lookup, instead of sorting the restaurants of
+    that location.
+    """
+
+    def __init__(self, df: pd.DataFrame, weights: dict[str, float] = DEFAULT_WEIGHTS, k: int = TOP_K) -> None:
+        self.df = df
+        self.k = k
+        self.scores = value_scores(df, weights)
+
+        # Row positions of the ranked restaurants, best value first. Ties keep the order of the dataset.
+        order = np.argsort(-self.scores, kind="stable")
+        self.order = order[np.isfinite(self.scores[order])]
+
+        self.top = {}
+        for column in ["Country", "City"]:
+            ranked = pd.Series(self.order, index=df[column].to_numpy()[self.order])
+            top = ranked.groupby(level=0, sort=False).head(k)
+            for location, positions in top.groupby(level=0, sort=False):
+                self.top[(column, location)] = positions.to_numpy()
+
+    def best_positions(self, country: str | None = None, city: str | None = None, limit: int = 10) -> np.ndarray:
+        """Get the row positions of the restaurants with the best value, optionally in a country or city.
+
+        Args:
+            country (str | None): country of the restaurants
+            city (str | None): city of the restaurants, which takes precedence over the country
+            limit (int): number of restaurants, at most the number of precomputed restaurants per location
+
+        Returns:
+            np.ndarray: row positions, best value first
+        """
+        if city:
+            positions = self.top.get(("City", city))
+        elif country:
+            positions = self.top.get(("Country", country))
+        else:
+            positions = self.order
+        if positions is None:
+            return np.empty(0, dtype=np.intp)
+        return positions[:limit]
+
+    def best_value(self, country: str | None = None, city: str | None = None, limit: int = 10) -> pd.DataFrame:
+        """Get the restaurants with the best value, see `best_positions`."""
+        return self.df.iloc[self.best_positions(country, city, limit)]
+
+    def best_matching(self, mask: np.ndarray, limit: int = 10) -> np.ndarray:
+        """Get the row positions of the restaurants with the best value among the restaurants of a boolean mask."""
+        return self.order[mask[self.order]][:limit]
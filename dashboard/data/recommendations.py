@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.data.ranking import Ranking
+from dashboard.data.search import SearchIndex
+from dashboard.data.vectors import VectorIndex
+
+# Number of restaurants matching the preferences which are provided to the LLM
+MAX_CANDIDATES = 10
+
+# Number of full-text matches which are filtered by the other preferences
+FULL_TEXT_POOL = 500
+
+CANDIDATE_COLUMNS = ["Name", "Location", "Cuisine", "Price (normalized)", "Award"]
+
+
+def preference_mask(
+    df: pd.DataFrame,
+    cuisine_index: dict[str, np.ndarray],
+    location_preference: str | None,
+    cuisine_preference: str | None,
+    price_range: list[str] | None,
+    award_range: list[str] | None,
+) -> np.ndarray:
+    """Get a boolean mask of the restaurants matching the structured preferences of the recommendations form.
+
+    The cuisine is matched with the cuisine index of the dataset, like the cuisine filter of the Geo page.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if location_preference:
+        mask &= ((df["City"] == location_preference) | (df["Country"] == location_preference)).to_numpy()
+    if cuisine_preference:
+        cuisine_mask = np.zeros(len(df), dtype=bool)
+        cuisine_mask[cuisine_index.get(cuisine_preference, np.empty(0, dtype=np.intp))] = True
+        mask &= cuisine_mask
+    if price_range:
+        mask &= df["Price (normalized)"].isin(price_range).to_numpy()
+    if award_range:
+        mask &= df["Award"].isin(award_range).to_numpy()
+    return mask
+
+
+def find_candidates(
+    search_index: SearchIndex,
+    vector_index: VectorIndex,
+    description: str | None,
+    mask: np.ndarray | None = None,
+    limit: int = MAX_CANDIDATES,
+    ranking: Ranking | None = None,
+) -> pd.DataFrame:
+    """Find the restaurants matching the description of the desired restaurant.
+
+    Restaurants are retrieved by the similarity of their description. If the description does not contain any known
+    words, the full-text search is used instead (e.g. to match the name of a restaurant). Without a description, the
+    restaurants with the best value are the candidates.
+
+    Args:
+        search_index (SearchIndex): search index of the dataset
+        vector_index (VectorIndex): vector index of the dataset
+        description (str | None): description of the desired restaurant
+        mask (np.ndarray | None): boolean mask of the restaurants matching the other preferences
+        limit (int): maximum number of candidates
+        ranking (Ranking | None): value ranking of the dataset, without a ranking there are no candidates for an
+            empty description
+
+    Returns:
+        pd.DataFrame: candidates, ordered by relevance
+    """
+    masks = None if mask is None else mask[np.newaxis]
+    return find_candidates_batch(search_index, vector_index, [description], masks, limit, ranking)[0]
+
+
+def find_candidates_batch(
+    search_index: SearchIndex,
+    vector_index: VectorIndex,
+    descriptions: list[str | None],
+    masks: np.ndarray | None = None,
+    limit: int = MAX_CANDIDATES,
+    ranking: Ranking | None = None,
+) -> list[pd.DataFrame]:
+    """Find the candidates of many descriptions at once, see `find_candidates`.
+
+    The descriptions are embedded and compared with all restaurants in a single batch.
+
+    Args:
+        masks (np.ndarray | None): boolean mask per description (2-D)
+    """
+    df = search_index.df
+    results = vector_index.query([description or "" for description in descriptions], limit, masks)
+
+    candidates = []
+    for i, (description, positions) in enumerate(zip(descriptions, results)):
+        if not description:
+            if ranking is None:
+                positions = []
+            elif masks is None:
+                positions = ranking.best_positions(limit=limit)
+            else:
+                positions = ranking.best_matching(masks[i], limit)
+        elif not len(positions):
+            positions = search_index.search(description, FULL_TEXT_POOL if masks is not None else limit)
+            if masks is not None:
+                positions = [position for position in positions if masks[i, position]][:limit]
+        candidates.append(df.iloc[positions][CANDIDATE_COLUMNS])
+    return candidates
+
+
+def format_candidates(candidates: pd.DataFrame) -> str:
+    """Format candidates as a list for a prompt."""
+    return "\n".join(
+        f"- {row['Name']} ({row['Location']}): {row['Cuisine']}, {row['Price (normalized)']}, {row['Award']}"
+        for _, row in candidates.iterrows()
+    )
@@ -0,0 +1,94 @@
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+from loguru import logger
+
+# Relative weight of the columns when ranking full-text matches
+NAME_WEIGHT = 10.0
+CUISINE_WEIGHT = 5.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def full_text_query(query: str) -> str | None:
+    """Convert user input into an FTS5 query matching any of its words (as prefix)."""
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    return " OR ".join(f'"{word}"*' for word in words)
+
+
+def trigram_query(query: str) -> str | None:
+    """Convert user input into an FTS5 query matching any of its trigrams, to tolerate typos."""
+    text = " ".join(re.findall(r"\w+", query.lower()))
+    trigrams = {text[i : i + 3] for i in range(len(text) - 2)} - {""}
+    trigrams = [trigram for trigram in trigrams if " " not in trigram]
+    if not trigrams:
+        return None
+    return " OR ".join(f'"{trigram}"' for trigram in sorted(trigrams))
+
+
+class SearchIndex:
+    """Full-text search over the name, cuisine and description of restaurants, and fuzzy search over names.
+
+    The index is an in-memory SQLite database using FTS5, with the row position of a restaurant as rowid.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        logger.info("Building search index..")
+        self.df = df
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.lock = threading.Lock()
+
+        rows = [
+            (position, name, cuisine, description)
+            for position, (name, cuisine, description) in enumerate(
+                df[["Name", "Cuisine", "Description"]].fillna("").itertuples(index=False)
+            )
+        ]
+        with self.connection:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE restaurants USING fts5(name, cuisine, description, tokenize='unicode61 "
+                "remove_diacritics 2')"
+            )
+            self.connection.execute("CREATE VIRTUAL TABLE names USING fts5(name, tokenize='trigram')")
+            self.connection.executemany(
+                "INSERT INTO restaurants(rowid, name, cuisine, description) VALUES (?, ?, ?, ?)", rows
+            )
+            self.connection.executemany("INSERT INTO names(rowid, name) VALUES (?, ?)", [row[:2] for row in rows])
+
+    def _query(self, sql: str, parameters: tuple) -> list[int]:
+        with self.lock:
+            return [row[0] for row in self.connection.execute(sql, parameters)]
+
+    def full_text(self, query: str, limit: int = 10) -> list[int]:
+        """Get the row positions of the restaurants best matching the query (BM25)."""
+        match = full_text_query(query)
+        if not match:
+            return []
+        return self._query(
+            "SELECT rowid FROM restaurants WHERE restaurants MATCH ? ORDER BY bm25(restaurants, ?, ?, ?) LIMIT ?",
+            (match, NAME_WEIGHT, CUISINE_WEIGHT, DESCRIPTION_WEIGHT, limit),
+        )
+
+    def fuzzy_names(self, query: str, limit: int = 10) -> list[int]:
+        """Get the row positions of the restaurants with the names sharing most trigrams with the query."""
+        match = trigram_query(query)
+        if not match:
+            return []
+        return self._query("SELECT rowid FROM names WHERE names MATCH ? ORDER BY rank LIMIT ?", (match, limit))
+
+    def search(self, query: str, limit: int = 10) -> list[int]:
+        """Get the row positions of the restaurants matching the query.
+
+        Full-text matches come first, followed by fuzzy matches of the name (e.g. for misspelled names).
+        """
+        positions = self.full_text(query, limit)
+        if len(positions) < limit:
+            positions += [position for position in self.fuzzy_names(query, limit) if position not in positions]
+        return positions[:limit]
+
+    def search_rows(self, query: str, limit: int = 10) -> pd.DataFrame:
+        """Get the restaurants matching the query, ordered by relevance."""
+        return self.df.iloc[self.search(query, limit)]
@@ -0,0 +1,185 @@
+import pickle
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from dashboard.data.loader import CACHE_DIR
+
+VECTOR_DIR = CACHE_DIR / "vectors"
+
+EMBEDDING_DIM = 256
+PROJECTION_SEED = 0
+MIN_DOCUMENT_FREQUENCY = 2  # Ignore words which occur in a single restaurant (e.g. typos)
+DOCUMENTS_PER_BATCH = 2048
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{3,}")
+STOP_WORDS = frozenset(
+    "the and for with this that are from its their there which has have was were into but not all can you your "
+    "our also more most very well where here when while than then they them been being these those".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase words, without stop words."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def projection_matrix(size: int) -> np.ndarray:
+    """Get the random projection of the vocabulary onto the embedding dimensions.
+
+    The matrix is generated from a fixed seed, so it does not need to be stored next to the vectors.
+    """
+    rng = np.random.default_rng(PROJECTION_SEED)
+    return (rng.standard_normal((size, EMBEDDING_DIM), dtype=np.float32) / np.sqrt(EMBEDDING_DIM)).astype(np.float32)
+
+
+def restaurant_texts(df: pd.DataFrame) -> pd.Series:
+    """Get the text describing every restaurant."""
+    return df["Cuisine"].fillna("") + " " + df["Description"].fillna("")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors to unit length, so their dot product is the cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class VectorIndex:
+    """Embeddings of the restaurants, for retrieving restaurants similar to a free-text description.
+
+    Texts are embedded offline as TF-IDF vectors which are reduced to EMBEDDING_DIM dimensions by a random
+    projection, which (approximately) preserves their cosine similarity.
+    """
+
+    def __init__(self, vectors: np.ndarray, vocabulary: dict[str, int], idf: np.ndarray) -> None:
+        self.vectors = vectors
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.projection = projection_matrix(len(vocabulary))
+
+    @classmethod
+    def build(cls, texts: pd.Series) -> "VectorIndex":
+        """Build the index, embedding every text."""
+        logger.info("Building vector index..")
+        tokens = pd.Series([tokenize(text) for text in texts]).explode().dropna()
+
+        # Term frequency per (document, token)
+        counts = tokens.groupby([tokens.index, tokens.to_numpy()]).size()
+        documents = counts.index.get_level_values(0).to_numpy()
+        words = counts.index.get_level_values(1)
+
+        document_frequency = words.value_counts()
+        document_frequency = document_frequency[document_frequency >= MIN_DOCUMENT_FREQUENCY].sort_index()
+        vocabulary = {word: i for i, word in enumerate(document_frequency.index)}
+        idf = (np.log((1 + len(texts)) / (1 + document_frequency.to_numpy())) + 1).astype(np.float32)
+
+        index = cls(np.empty((0, EMBEDDING_DIM), dtype=np.float32), vocabulary, idf)
+
+        token_ids = words.map(vocabulary).to_numpy()
+        known = ~np.isnan(token_ids)
+        index.vectors = index._embed_counts(
+            len(texts), documents[known], token_ids[known].astype(np.intp), counts.to_numpy()[known]
+        )
+        return index
+
+    @classmethod
+    def load(cls, df: pd.DataFrame, version: str) -> "VectorIndex":
+        """Load the index of a dataset version, building and storing it if not found in cache.
+
+        The vectors are memory-mapped, so all processes share the same pages of the file.
+        """
+        vectors_path, vocabulary_path = index_paths(version)
+        if not vectors_path.is_file():
+            index = cls.build(restaurant_texts(df))
+            index.save(version)
+        else:
+            logger.info(f"Loading vector index {version} from cache..")
+
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if len(vectors) != len(df):
+            logger.warning(f"Vector index {version} does not match the dataset, rebuilding it in memory..")
+            return cls.build(restaurant_texts(df))
+
+        vocabulary, idf = pickle.loads(vocabulary_path.read_bytes())
+        return cls(vectors, vocabulary, idf)
+
+    def save(self, version: str) -> None:
+        """Store the index of a dataset version."""
+        vectors_path, vocabulary_path = index_paths(version)
+        vectors_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # The vocabulary is written first and the vectors last, as the vectors file marks the index as complete
+        vocabulary_path.write_bytes(pickle.dumps((self.vocabulary, self.idf)))
+        tmp_path = vectors_path.with_suffix(".tmp.npy")
+        np.save(tmp_path, self.vectors)
+        tmp_path.replace(vectors_path)
+
+    def _embed_counts(self, size: int, documents: np.ndarray, token_ids: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Embed documents given their token counts, sorted by document."""
+        weights = ((1 + np.log(counts)) * self.idf[token_ids]).astype(np.float32)
+        vectors = np.zeros((size, EMBEDDING_DIM), dtype=np.float32)
+
+        # Sum the projected tokens per document, in batches of documents to bound the memory used
+        for start in range(0, size, DOCUMENTS_PER_BATCH):
+            lower, upper = np.searchsorted(documents, [start, start + DOCUMENTS_PER_BATCH])
+            if lower == upper:
+                continue
+            batch_documents = documents[lower:upper]
+            offsets = np.flatnonzero(np.r_[True, batch_documents[1:] != batch_documents[:-1]])
+            projected = weights[lower:upper, None] * self.projection[token_ids[lower:upper]]
+            vectors[batch_documents[offsets]] = np.add.reduceat(projected, offsets, axis=0)
+
+        return normalize(vectors)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts (e.g. queries).
+
+        Returns:
+            np.ndarray: unit vectors, or zero vectors for texts without any known words
+        """
+        documents, token_ids = [], []
+        for document, text in enumerate(texts):
+            ids = [self.vocabulary[token] for token in tokenize(text) if token in self.vocabulary]
+            documents += [document] * len(ids)
+            token_ids += ids
+
+        pairs = pd.Series(1, index=pd.MultiIndex.from_arrays([documents, token_ids])).groupby(level=[0, 1]).size()
+        return self._embed_counts(
+            len(texts),
+            pairs.index.get_level_values(0).to_numpy(dtype=np.intp),
+            pairs.index.get_level_values(1).to_numpy(dtype=np.intp),
+            pairs.to_numpy(),
+        )
+
+    def query(self, texts: list[str], k: int = 10, mask: np.ndarray | None = None) -> list[np.ndarray]:
+        """Get the restaurants most similar to every text.
+
+        Args:
+            texts (list[str]): queries, which are answered in a single batch
+            k (int): number of restaurants per query
+            mask (np.ndarray | None): boolean mask of the restaurants to consider, e.g. matching other preferences.
+                Either a single mask for all queries, or one mask per query (2-D).
+
+        Returns:
+            list[np.ndarray]: row positions per query, most similar first. Restaurants without any similarity are
+            left out.
+        """
+        scores = self.embed(texts) @ self.vectors.T
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(k, scores.shape[1])
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k] if k else np.empty(0, dtype=np.intp)
+            top = top[np.argsort(-row[top], kind="stable")]
+            results.append(top[row[top] > 0])
+        return results
+
+
+def index_paths(version: str) -> tuple[Path, Path]:
+    """Get the paths of the vectors and the vocabulary of a dataset version."""
+    return VECTOR_DIR / f"{version}.npy", VECTOR_DIR / f"{version}.vocabulary.pkl"
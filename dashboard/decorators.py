@@ -1,12 +1,35 @@
+import functools
+import os
+
 import pandas as pd
 
-from dashboard.caching import retrieve_data
+from dashboard.instrumentation import stage
+from dashboard.store import DatasetStore
+
+# Verify that callbacks do not modify the shared dataset, which is slow and meant for development
+CHECK_MUTATIONS = os.getenv("DATASET_MUTATION_CHECK", "0") == "1"
+
+
+class DatasetMutationError(RuntimeError):
+    """Raised when a function modified the shared dataset."""
+
+
+def fingerprint(df: pd.DataFrame) -> tuple:
+    """Get a fingerprint of the columns, types, index and values of a DataFrame."""
+    return (
+        tuple(df.columns),
+        tuple(df.dtypes.astype(str)),
+        df.shape,
+        int(pd.util.hash_pandas_object(df, index=True).sum()),
+    )
 
 
 def filter_by_country(func):
+    @functools.wraps(func)
     def wrapper(df, country, *args, **kwargs):
         # Convert the dictionary to DataFrame and filter by country
-        filtered_df = df[df["Country"] == country]
+        with stage("filter"):
+            filtered_df = df[df["Country"] == country]
 
         # Call the original function with the filtered DataFrame
         return func(filtered_df, *args, **kwargs)
@@ -26,11 +49,19 @@ def df_from_dict(func):
 
 
 def load_df(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Convert the dictionary to DataFrame
-        df = retrieve_data()
+        # The shared dataset is passed without copying it, so functions must not modify the DataFrame they are given
+        with stage("load"):
+            df = DatasetStore().get()
 
-        # Call the original function with the filtered DataFrame
-        return func(df, *args, **kwargs)
+        if not CHECK_MUTATIONS:
+            return func(df, *args, **kwargs)
+
+        before = fingerprint(df)
+        result = func(df, *args, **kwargs)
+        if fingerprint(df) != before:
+            raise DatasetMutationError(f"{func.__name__} modified the shared dataset")
+        return result
 
     return wrapper
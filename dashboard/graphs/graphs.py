@@ -1,66 +1,75 @@
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 
+from dashboard.data.editions import MOVEMENTS_ORDERED
 from dashboard.graphs.utils import apply_style_to_fig
 from dashboard.utils import MICHELIN_PRIMARY_COLOR
 
 MICHELIN_AWARDS_ORDERED = ["Selected Restaurants", "Bib Gourmand", "1 Star", "2 Stars", "3 Stars"]
 PRICE_ORDERED = ["Budget-Friendly", "Moderate", "Premium", "Luxury"]
 
+# plotly.express is imported by the functions using it, as it takes long to import and is not needed to start the app
 
-def graph_top_countries(df: pd.DataFrame, top: int = 10) -> go.Figure:
-    """Graph the top x countries in the dataset."""
-    counts = df["Country"].value_counts()[:top].reset_index()
-    fig = px.bar(counts, x="Country", y="count", labels={"count": "Number of restaurants"}, text=counts["count"])
+
+def graph_counts(counts: pd.Series, top: int | None = None, category_orders: dict | None = None) -> go.Figure:
+    """Graph the number of restaurants per value of a column, given the counts (e.g. from `value_counts`)."""
+    import plotly.express as px
+
+    column = counts.index.name
+    counts = counts[:top].reset_index()
+    fig = px.bar(
+        counts,
+        x=column,
+        y="count",
+        labels={"count": "Number of restaurants"},
+        category_orders=category_orders,
+        text=counts["count"],
+    )
     fig.update_traces(textposition="outside")
+
     fig = apply_style_to_fig(fig)
     return fig
 
 
+def graph_top_countries(df: pd.DataFrame, top: int = 10) -> go.Figure:
+    """Graph the top x countries in the dataset."""
+    return graph_counts(df["Country"].value_counts(), top)
+
+
 def graph_top_cities(df: pd.DataFrame, top: int = 10) -> go.Figure:
     """Graph the top x cities in the dataset."""
-    counts = df["City"].value_counts()[:top].reset_index()
-    fig = px.bar(counts, x="City", y="count", labels={"count": "Number of restaurants"}, text=counts["count"])
-    fig.update_traces(textposition="outside")
-    fig = apply_style_to_fig(fig)
-    return fig
+    return graph_counts(df["City"].value_counts(), top)
 
 
 def graph_top_cuisine(df: pd.DataFrame, top: int = 10) -> go.Figure:
     """Graph top x cuisines in the dataset."""
-    counts = df["Cuisine"].value_counts()[:top].reset_index()
-    fig = px.bar(counts, x="Cuisine", y="count", labels={"count": "Number of restaurants"}, text=counts["count"])
-    fig.update_traces(textposition="outside")
-
-    fig = apply_style_to_fig(fig)
-    return fig
+    return graph_counts(df["Cuisine"].value_counts(), top)
 
 
 def graph_award_distribution(df: pd.DataFrame) -> go.Figure:
     """Graph the distribution of the award column."""
-    counts = df["Award"].value_counts().reset_index()
-    fig = px.bar(counts, x="Award", y="count", labels={"count": "Number of restaurants"}, text=counts["count"])
-    fig.update_traces(textposition="outside")
-
-    fig = apply_style_to_fig(fig)
-    return fig
+    return graph_counts(df["Award"].value_counts())
 
 
 def graph_green_star_distribution(df: pd.DataFrame) -> go.Figure:
     """Graph the distribution of the Green Star."""
-    df["GreenStar"] = df["GreenStar"].map({True: "Awarded", False: "Not awarded"})
+    return graph_green_star_counts(df["GreenStar"].value_counts())
+
 
-    counts = df["GreenStar"].value_counts()
+def graph_green_star_counts(counts: pd.Series) -> go.Figure:
+    """Graph the distribution of the Green Star, given the number of restaurants per value of 'GreenStar'."""
+    labels = counts.index.map({True: "Awarded", False: "Not awarded"})
 
     # Use `hole` to create a donut-like pie chart
-    fig = go.Figure(data=[go.Pie(labels=counts.index, values=counts, hole=0.5)])
+    fig = go.Figure(data=[go.Pie(labels=labels, values=counts, hole=0.5)])
     fig.update_traces(marker=dict(colors=[MICHELIN_PRIMARY_COLOR, "#23BDAD"]))
     return fig
 
 
 def graph_map(df: pd.DataFrame) -> go.Figure:
     """Create a map with all restaurants (size based on award)."""
+    import plotly.express as px
+
     fig = px.scatter_map(
         data_frame=df,
         lat="Latitude",
@@ -82,6 +91,8 @@ def graph_map(df: pd.DataFrame) -> go.Figure:
 
 
 def graph_map_cuisine(df: pd.DataFrame) -> go.Figure:
+    import plotly.express as px
+
     fig = px.scatter_map(
         df,
         lat="Latitude",
@@ -98,6 +109,8 @@ def graph_map_cuisine(df: pd.DataFrame) -> go.Figure:
 
 
 def graph_green_star_map(df: pd.DataFrame) -> go.Figure:
+    import plotly.express as px
+
     df = df[df["GreenStar"] == 1]
     fig = px.scatter_map(
         df,
@@ -115,7 +128,14 @@ def graph_green_star_map(df: pd.DataFrame) -> go.Figure:
 
 def graph_price_distribution(df: pd.DataFrame, normalized_values: bool = False) -> go.Figure:
     """Graph the price distribution."""
-    counts = df["Price"].value_counts().reset_index()
+    return graph_price_counts(df["Price"].value_counts())
+
+
+def graph_price_counts(counts: pd.Series) -> go.Figure:
+    """Graph the price distribution, given the number of restaurants per value of 'Price'."""
+    import plotly.express as px
+
+    counts = counts.reset_index()
     fig = px.bar(counts, x="Price", y="count", labels={"count": "Number of restaurants"}, text=counts["count"])
     fig.update_xaxes(categoryorder="category ascending")
     fig.update_traces(textposition="outside")
@@ -126,24 +146,18 @@ def graph_price_distribution(df: pd.DataFrame, normalized_values: bool = False)
 
 def graph_price_distribution_normalized(df: pd.DataFrame) -> go.Figure:
     """Graph the price distribution."""
-    col = "Price (normalized)"
-    counts = df[col].value_counts().reset_index()
-    fig = px.bar(
-        counts,
-        x=col,
-        y="count",
-        labels={"count": "Number of restaurants"},
-        category_orders={"Price (normalized)": PRICE_ORDERED},
-        text=counts["count"],
-    )
-    fig.update_traces(textposition="outside")
+    return graph_price_normalized_counts(df["Price (normalized)"].value_counts())
 
-    fig = apply_style_to_fig(fig)
-    return fig
+
+def graph_price_normalized_counts(counts: pd.Series) -> go.Figure:
+    """Graph the price distribution, given the number of restaurants per value of 'Price (normalized)'."""
+    return graph_counts(counts, category_orders={"Price (normalized)": PRICE_ORDERED})
 
 
 def graph_scatter_best_value(df: pd.DataFrame) -> go.Figure:
     """Create a scatter plot for best value."""
+    import plotly.express as px
+
     if not len(df["Country"].unique()):
         raise ValueError("Please pass a DataFrame with only one country.")
 
@@ -164,12 +178,43 @@ def graph_scatter_best_value(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+def graph_scatter_best_value_cells(cells: pd.DataFrame) -> go.Figure:
+    """Create a scatter plot for best value, with one bubble per award and price.
+
+    Args:
+        cells (pd.DataFrame): number of restaurants ('count') and their mean 'Value' per 'Award' and 'Price'
+    """
+    import plotly.express as px
+
+    fig = px.scatter(
+        cells,
+        x="Price",
+        y="Award",
+        size="count",  # Larger bubbles indicate more restaurants
+        color="Value",
+        labels={"Price": "Price Category", "Award": "Michelin Awards", "count": "Restaurants", "Value": "Mean value"},
+        size_max=60,
+        color_continuous_scale="Inferno",
+        category_orders={"Award": list(reversed(MICHELIN_AWARDS_ORDERED))},
+    )
+    fig.update_xaxes(categoryorder="category ascending")
+    fig = apply_style_to_fig(fig, apply_trace_color=False)
+    return fig
+
+
 def graph_heatmap_price(df: pd.DataFrame) -> go.Figure:
     """Create a heatmap using price and award."""
     if not len(df["Country"].unique()):
         raise ValueError("Please pass a DataFrame with only one country.")
 
     heatmap_data = pd.pivot_table(df, values="Name", index="Award", columns="Price", aggfunc="count")
+    return graph_heatmap_price_counts(heatmap_data)
+
+
+def graph_heatmap_price_counts(heatmap_data: pd.DataFrame) -> go.Figure:
+    """Create a heatmap, given the number of restaurants per award (rows) and price (columns)."""
+    import plotly.express as px
+
     heatmap_data = heatmap_data.reindex(reversed(MICHELIN_AWARDS_ORDERED), level=0)
 
     fig = px.imshow(
@@ -179,3 +224,22 @@ def graph_heatmap_price(df: pd.DataFrame) -> go.Figure:
     )
     fig = apply_style_to_fig(fig, apply_trace_color=False)
     return fig
+
+
+def graph_award_movement(df: pd.DataFrame) -> go.Figure:
+    """Graph the award movement between two editions, per award of the current edition."""
+    import plotly.express as px
+
+    # Dropped restaurants have no current award, so they are shown under their previous award
+    award = df["Award (current)"].fillna(df["Award (previous)"])
+    counts = df.groupby([award.rename("Award"), "Movement"]).size().reset_index(name="count")
+    fig = px.bar(
+        counts,
+        x="Award",
+        y="count",
+        color="Movement",
+        labels={"count": "Number of restaurants"},
+        category_orders={"Award": MICHELIN_AWARDS_ORDERED, "Movement": MOVEMENTS_ORDERED},
+    )
+    fig = apply_style_to_fig(fig, apply_trace_color=False)
+    return fig
@@ -0,0 +1,218 @@
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import Flask, Response, g, has_request_context
+from loguru import logger
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+# Fraction of callback calls to profile, profiles of calls slower than the threshold are stored
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_THRESHOLD = float(os.getenv("PROFILE_THRESHOLD_SECONDS", 1))
+PROFILE_DIR = Path("cache/profiles")
+
+_local = threading.local()
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus format."""
+
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        with self.lock:
+            lines = []
+            cumulative = 0
+            for bucket, count in zip(self.buckets + ("+Inf",), self.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+            lines.append(f"{name}_count{{{labels}}} {self.count}")
+            return lines
+
+
+class Value:
+    """Single value of a counter or gauge."""
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, amount: float) -> None:
+        with self.lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        with self.lock:
+            self.value = value
+
+    def render(self, name: str, labels: str) -> list[str]:
+        return [f"{name}{{{labels}}} {self.value}"]
+
+
+class Metrics:
+    """Registry of histograms, counters and gauges, keyed by metric name and labels."""
+
+    def __init__(self) -> None:
+        self.histograms = {}
+        self.values = {}
+        self.descriptions = {}
+        self.kinds = {}
+        self.lock = threading.Lock()
+
+    def register(self, name: str, description: str, kind: str = "histogram") -> None:
+        self.descriptions[name] = description
+        self.kinds[name] = kind
+
+    def observe(self, name: str, value: float, buckets: tuple, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def _value(self, name: str, labels: dict) -> Value:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            value = self.values.get(key)
+            if value is None:
+                value = self.values[key] = Value()
+        return value
+
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        """Increment a counter."""
+        self._value(name, labels).add(amount)
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge."""
+        self._value(name, labels).set(value)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format."""
+        lines = []
+        for name, description in self.descriptions.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {self.kinds[name]}")
+            series = self.histograms if self.kinds[name] == "histogram" else self.values
+            for (metric_name, labels), metric in sorted(series.items()):
+                if metric_name == name:
+                    lines += metric.render(name, ",".join(f'{key}="{value}"' for key, value in labels))
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.register("dashboard_callback_duration_seconds", "Wall time of Dash callbacks, per stage.")
+metrics.register("dashboard_callback_payload_bytes", "Size of the response of Dash callbacks.")
+metrics.register("dashboard_cache_requests_total", "Lookups per cache namespace and tier, by result.", "counter")
+metrics.register("dashboard_cache_evictions_total", "Entries evicted per cache namespace and tier.", "counter")
+metrics.register("dashboard_cache_bytes", "Size of the entries per cache namespace and tier.", "gauge")
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage (e.g. load, filter, aggregate, figure) of the callback that is currently running."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = getattr(_local, "stages", None)
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def instrument(name: str):
+    """Record the wall time of a callback and its stages.
+
+    Metrics are kept per process, so every gunicorn worker exposes its own metrics.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _local.stages = {}
+            profiler = _start_profiler() if random.random() < PROFILE_SAMPLE_RATE else None
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                stages, _local.stages = _local.stages, None
+
+                metrics.observe(
+                    "dashboard_callback_duration_seconds", duration, DURATION_BUCKETS, callback=name, stage="total"
+                )
+                for stage_name, stage_duration in stages.items():
+                    metrics.observe(
+                        "dashboard_callback_duration_seconds",
+                        stage_duration,
+                        DURATION_BUCKETS,
+                        callback=name,
+                        stage=stage_name,
+                    )
+
+                if profiler:
+                    _stop_profiler(profiler, name, duration)
+
+                # The size of the response is only known after Dash serialized it, see `init_app`
+                if has_request_context():
+                    g.callback_name = name
+
+        return wrapper
+
+    return decorator
+
+
+def _start_profiler() -> cProfile.Profile | None:
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active (e.g. in another thread)
+        return None
+    return profiler
+
+
+def _stop_profiler(profiler: cProfile.Profile, name: str, duration: float) -> None:
+    profiler.disable()
+    if duration < PROFILE_THRESHOLD:
+        return
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof"
+    profiler.dump_stats(path)
+    logger.warning(f"Slow callback {name} took {duration:.2f}s, profile stored in {path}")
+
+
+def init_app(server: Flask) -> None:
+    """Expose the metrics on /metrics and record the size of callback responses."""
+
+    @server.after_request
+    def record_payload_size(response: Response) -> Response:
+        name = g.pop("callback_name", None)
+        if name and response.content_length is not None:
+            metrics.observe("dashboard_callback_payload_bytes", response.content_length, SIZE_BUCKETS, callback=name)
+        return response
+
+    @server.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
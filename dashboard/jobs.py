@@ -0,0 +1,214 @@
+"""Run LLM invocations in the background, so their progress can be shown while the agent is running.
+
+A callback starts a job and returns right away. The job records the steps of the agent and the tokens of the answer
+in SQLite, which is polled by the page (with a dcc.Interval). The jobs are shared by all processes, so any worker can
+answer the polls of a job.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+import dash_bootstrap_components as dbc
+from dash import dcc, html
+from langchain_core.callbacks import BaseCallbackHandler
+from loguru import logger
+
+from dashboard.data.llm import MAX_EXECUTION_TIME, QUEUE_TIMEOUT, LLMBusyError
+from dashboard.instrumentation import DURATION_BUCKETS, metrics
+from dashboard.singleton import SingletonMeta
+
+JOBS_FILE = Path("cache/jobs.sqlite")
+MAX_AGE = 60 * 60  # Seconds to keep finished jobs, for polls which arrive late
+# Seconds without progress after which a running job has failed, e.g. because the process running it has died. The
+# agent may not report progress while it waits for its turn and runs, which is bounded by the budget of the LLM.
+STALE_AFTER = QUEUE_TIMEOUT + MAX_EXECUTION_TIME + 60
+
+POLL_INTERVAL = 500  # Milliseconds between the polls of a page
+FLUSH_INTERVAL = 0.2  # Seconds between writes of the streamed tokens
+
+RUNNING = "running"
+DONE = "done"
+BUSY = "busy"
+FAILED = "failed"
+
+metrics.register("dashboard_llm_time_to_first_token_seconds", "Time until the first token of the answer of the LLM.")
+metrics.register("dashboard_llm_duration_seconds", "Wall time of LLM jobs, by status.")
+
+
+class JobStore(metaclass=SingletonMeta):
+    """Progress of the background jobs, stored in SQLite."""
+
+    def __init__(self, path: Path = JOBS_FILE) -> None:
+        logger.debug("JobStore object is being created..")
+        self.path = path
+        self._local = threading.local()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "started REAL NOT NULL, updated REAL NOT NULL, steps TEXT NOT NULL DEFAULT '[]', "
+                "output TEXT NOT NULL DEFAULT '', result TEXT, error TEXT)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_jobs_updated ON jobs (updated)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread, connections are not reused by a forked process."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.pid = os.getpid()
+        return connection
+
+    def create(self, kind: str) -> str:
+        """Create a running job, and remove the jobs which were finished long ago.
+
+        Returns:
+            str: id of the job
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("DELETE FROM jobs WHERE updated < ?", (now - MAX_AGE,))
+            connection.execute(
+                "INSERT INTO jobs (id, kind, status, started, updated) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, RUNNING, now, now),
+            )
+        return job_id
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self._connection() as connection:
+            connection.execute(
+                f"UPDATE jobs SET {assignments}, updated = ? WHERE id = ?", (*fields.values(), time.time(), job_id)
+            )
+
+    def set_steps(self, job_id: str, steps: list[str]) -> None:
+        self._update(job_id, steps=json.dumps(steps))
+
+    def set_output(self, job_id: str, output: str) -> None:
+        self._update(job_id, output=output)
+
+    def finish(self, job_id: str, output: str, result: Any = None) -> None:
+        """Mark a job as done, with its final output and a result for the page (e.g. the new history entry)."""
+        self._update(job_id, status=DONE, output=output, result=json.dumps(result))
+
+    def fail(self, job_id: str, status: str, error: str) -> None:
+        self._update(job_id, status=status, error=error)
+
+    def get(self, job_id: str) -> dict | None:
+        """Get a job, a running job without progress for `STALE_AFTER` seconds is marked as failed."""
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is not None and row["status"] == RUNNING and row["updated"] < time.time() - STALE_AFTER:
+            logger.warning(f"Job {job_id} ({row['kind']}) has not made progress for {STALE_AFTER:.0f} seconds")
+            with self._connection() as connection:
+                # Unless the job has finished in the meantime
+                connection.execute(
+                    "UPDATE jobs SET status = ?, error = ? WHERE id = ? AND status = ?",
+                    (FAILED, "The job was interrupted", job_id, RUNNING),
+                )
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["steps"] = json.loads(job["steps"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class ProgressHandler(BaseCallbackHandler):
+    """Record the steps of the agent and the tokens of its answer in the job store."""
+
+    def __init__(self, job_id: str, kind: str) -> None:
+        self.job_id = job_id
+        self.kind = kind
+        self.started = time.monotonic()
+        self.first_token = None
+        self.steps = []
+        self.tokens = []
+        self.flushed = 0.0
+
+    def on_agent_action(self, action, **kwargs) -> None:
+        tool_input = action.tool_input
+        if isinstance(tool_input, dict):
+            tool_input = tool_input.get("query", json.dumps(tool_input))
+        self.steps.append(f"{action.tool}: {tool_input}" if tool_input else action.tool)
+        JobStore().set_steps(self.job_id, self.steps)
+
+        # Tokens before an action are not part of the answer
+        if self.tokens:
+            self.tokens = []
+            JobStore().set_output(self.job_id, "")
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if not token:
+            return
+        if self.first_token is None:
+            self.record_first_token()
+        self.tokens.append(token)
+
+        if time.monotonic() - self.flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+    def record_first_token(self) -> None:
+        self.first_token = time.monotonic() - self.started
+        metrics.observe("dashboard_llm_time_to_first_token_seconds", self.first_token, DURATION_BUCKETS, kind=self.kind)
+
+    def flush(self) -> None:
+        JobStore().set_output(self.job_id, "".join(self.tokens))
+        self.flushed = time.monotonic()
+
+
+def start_job(kind: str, func: Callable[[ProgressHandler], tuple[str, Any]]) -> str:
+    """Start a job in a background thread.
+
+    Args:
+        kind (str): type of the job, e.g. "analysis"
+        func (Callable[[ProgressHandler], tuple[str, Any]]): function running the LLM with the handler as callback,
+            returning the answer and a result for the page
+
+    Returns:
+        str: id of the job
+    """
+    job_id = JobStore().create(kind)
+
+    def run():
+        handler = ProgressHandler(job_id, kind)
+        status = DONE
+        try:
+            output, result = func(handler)
+            JobStore().finish(job_id, output, result)
+        except LLMBusyError as e:
+            status = BUSY
+            JobStore().fail(job_id, status, str(e))
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({kind}) failed")
+            status = FAILED
+            JobStore().fail(job_id, status, f"{type(e).__name__}: {e}")
+
+        # Answers without streamed tokens (e.g. from cache) arrive all at once
+        if status == DONE and handler.first_token is None:
+            handler.record_first_token()
+        duration = time.monotonic() - handler.started
+        metrics.observe("dashboard_llm_duration_seconds", duration, DURATION_BUCKETS, kind=kind, status=status)
+
+    threading.Thread(target=run, name=f"job-{kind}", daemon=True).start()
+    return job_id
+
+
+def render_job(job: dict) -> list:
+    """Render the progress of a running job: the steps of the agent and the answer so far."""
+    steps = [html.Li(html.Code(step)) for step in job["steps"]]
+    return [
+        html.Div([dbc.Spinner(size="sm", spinner_class_name="me-2"), "Working on it.."], className="mb-2"),
+        html.Ol(steps, className="small text-muted") if steps else None,
+        dcc.Markdown(job["output"]) if job["output"] else None,
+    ]
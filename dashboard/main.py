@@ -2,25 +2,37 @@ import os
 
 import dash
 import dash_bootstrap_components as dbc
+import pandas as pd
 from dash import Dash, Input, Output, State, dcc, html
 from dotenv import load_dotenv
 from flask import send_from_directory
 from loguru import logger
 
-from dashboard.caching import cache, retrieve_data
-from dashboard.data.database import Database
-from dashboard.data.llm import LLM
-from dashboard.utils import TITLE
-
+# The settings of the modules are read when these are imported, so the .env file is loaded first
 load_dotenv()
 
+from dashboard.caching import init_app as init_caches  # noqa: E402
+from dashboard.data.database import Database  # noqa: E402
+from dashboard.instrumentation import init_app as init_instrumentation  # noqa: E402
+from dashboard.store import DatasetStore  # noqa: E402
+from dashboard.utils import TITLE  # noqa: E402
+
+# The dataset is shared by all callbacks without copying it. With copy-on-write, frames derived from it (e.g. filtered
+# frames) never modify the shared dataset, and are only copied when they are modified themselves.
+pd.set_option("mode.copy_on_write", True)
+
 app = Dash(title=TITLE, external_stylesheets=[dbc.icons.BOOTSTRAP], use_pages=True, suppress_callback_exceptions=True)
 server = app.server
-cache.init_app(app.server)
+init_caches(app.server)
+init_instrumentation(app.server)
 
-df = retrieve_data()
-Database().load(df)
-LLM()
+df = DatasetStore().load()
+# Precompute the aggregates of the Pricing page and the dropdown options (including the cuisine index of the Geo page)
+# before gunicorn forks, so all workers share them
+DatasetStore().get_price_cube()
+DatasetStore().get_catalog()
+# The SQL agent of the LLM pages (and langchain) is only loaded once it is used, which keeps the startup fast
+Database().load(df, DatasetStore().version)
 
 MICHELIN_LOGO = "assets/img/logos/MichelinStar.svg"
 
@@ -30,6 +42,8 @@ NAVBAR = {
         "Countries": {"icon": "bi bi-globe-americas", "relative_path": "/countries"},
         "Pricing": {"icon": "bi bi-currency-dollar", "relative_path": "/pricing"},
         "Geo": {"icon": "bi bi-pin", "relative_path": "/geo"},
+        "Editions": {"icon": "bi bi-calendar3", "relative_path": "/editions"},
+        "Search": {"icon": "bi bi-search", "relative_path": "/search"},
     },
     "LLM": {
         "Analysis": {"icon": "bi bi-stars", "relative_path": "/llm-analysis"},
@@ -3,8 +3,7 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash import Input, Output, callback, dcc, html
 
-from dashboard.caching import retrieve_data
-from dashboard.data.utils import number_of_cities, number_of_restaurants, top_cuisine, unique_countries
+from dashboard.data.utils import number_of_cities, number_of_restaurants, top_cuisine
 from dashboard.decorators import filter_by_country, load_df
 from dashboard.graphs.graphs import (
     graph_award_distribution,
@@ -12,6 +11,8 @@ from dashboard.graphs.graphs import (
     graph_top_cities,
     graph_top_cuisine,
 )
+from dashboard.instrumentation import instrument, stage
+from dashboard.store import DatasetStore
 from dashboard.utils import TITLE
 
 PAGE_TITLE = "Countries"
@@ -20,7 +21,6 @@ dash.register_page(__name__, name=PAGE_TITLE, title=f"{PAGE_TITLE} | {TITLE}", o
 
 
 def layout():
-    df = retrieve_data()
     return [
         html.H3("Countries", className="mb-3"),
         html.P(
@@ -30,7 +30,10 @@ def layout():
         dbc.Row(
             dbc.Col(
                 dcc.Dropdown(
-                    sorted(unique_countries(df)), value="France", clearable=False, id="country-dropdown-selection"
+                    DatasetStore().get_catalog()["countries"],
+                    value="France",
+                    clearable=False,
+                    id="country-dropdown-selection",
                 ),
                 md=3,
                 sm=12,
@@ -167,16 +170,22 @@ def layout():
         Input("country-dropdown-selection", "value"),
     ],
 )
+@instrument("countries")
 @load_df
 @filter_by_country
 def update_numbers(df: pd.DataFrame):
     """Callback to update numbers on the top of homepage."""
-    return (
-        number_of_cities(df),
-        number_of_restaurants(df),
-        top_cuisine(df),
-        graph_map(df),
-        graph_top_cities(df),
-        graph_top_cuisine(df),
-        graph_award_distribution(df),
-    )
+    with stage("aggregate"):
+        numbers = (
+            number_of_cities(df),
+            number_of_restaurants(df),
+            top_cuisine(df),
+        )
+    with stage("figure"):
+        figures = (
+            graph_map(df),
+            graph_top_cities(df),
+            graph_top_cuisine(df),
+            graph_award_distribution(df),
+        )
+    return numbers + figures
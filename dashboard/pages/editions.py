@@ -0,0 +1,139 @@
+import dash
+import dash_bootstrap_components as dbc
+from dash import Input, Output, callback, dcc, html
+
+from dashboard.caching import retrieve_award_movement
+from dashboard.data.loader import available_editions, dataset_version
+from dashboard.graphs.graphs import graph_award_movement
+from dashboard.instrumentation import instrument, stage
+from dashboard.utils import TITLE
+
+PAGE_TITLE = "Editions"
+MAX_TABLE_ROWS = 100
+
+dash.register_page(__name__, name=PAGE_TITLE, title=f"{PAGE_TITLE} | {TITLE}", order=4)
+
+
+def layout():
+    editions = available_editions()
+    if len(editions) < 2:
+        return [
+            html.H3(PAGE_TITLE, className="mb-3"),
+            dbc.Alert("At least two editions of the Michelin Guide are needed to compare awards.", color="light"),
+        ]
+
+    return [
+        html.H3(PAGE_TITLE, className="mb-3"),
+        html.P(
+            """Compare the awards between two editions of the Michelin Guide.
+        """
+        ),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Dropdown(editions, value=editions[-2], clearable=False, id="editions-previous-selection"),
+                    md=3,
+                    sm=12,
+                ),
+                dbc.Col(
+                    dcc.Dropdown(editions, value=editions[-1], clearable=False, id="editions-current-selection"),
+                    md=3,
+                    sm=12,
+                ),
+            ],
+            class_name="mt-1",
+        ),
+        html.Hr(),
+        html.Div(id="editions-alert"),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.Card(
+                        dbc.CardBody(
+                            [
+                                html.H4("-", id=f"editions-number-{movement.lower()}", className="card-title"),
+                                html.H6(movement, className="card-subtitle"),
+                            ]
+                        ),
+                    ),
+                    class_name="mb-3",
+                    md=3,
+                    sm=12,
+                )
+                for movement in ["Promoted", "Demoted", "New", "Dropped"]
+            ]
+            + [
+                dbc.Col(
+                    dbc.Card(
+                        dbc.CardBody(
+                            [
+                                html.H4("Award movement"),
+                                html.P("Movement of restaurants per award of the most recent edition."),
+                                dcc.Graph(id="editions-graph-movement"),
+                            ]
+                        )
+                    ),
+                    class_name="mb-3",
+                    width=12,
+                ),
+                dbc.Col(
+                    dbc.Card(
+                        dbc.CardBody(
+                            [
+                                html.H4("Changed awards"),
+                                html.P("Restaurants that were promoted or demoted."),
+                                html.Div(id="editions-table-changes"),
+                            ]
+                        )
+                    ),
+                    class_name="mb-3",
+                    width=12,
+                ),
+            ],
+            class_name="g-3",
+        ),
+    ]
+
+
+@callback(
+    [
+        Output("editions-alert", "children"),
+        Output("editions-number-promoted", "children"),
+        Output("editions-number-demoted", "children"),
+        Output("editions-number-new", "children"),
+        Output("editions-number-dropped", "children"),
+        Output("editions-graph-movement", "figure"),
+        Output("editions-table-changes", "children"),
+    ],
+    [
+        Input("editions-previous-selection", "value"),
+        Input("editions-current-selection", "value"),
+    ],
+)
+@instrument("editions")
+def update_editions(previous: int, current: int):
+    """Update the comparison between two editions."""
+    if previous >= current:
+        alert = dbc.Alert("Please select an older and a newer edition.", color="danger")
+        return (alert,) + (dash.no_update,) * 6
+
+    with stage("load"):
+        df = retrieve_award_movement(previous, current, (dataset_version(previous), dataset_version(current)))
+
+    with stage("aggregate"):
+        counts = df["Movement"].value_counts()
+        changes = df[df["Movement"].isin(["Promoted", "Demoted"])].drop(columns="Movement")
+
+    with stage("figure"):
+        figure = graph_award_movement(df)
+        table = dbc.Table.from_dataframe(changes.head(MAX_TABLE_ROWS), striped=True, hover=True, size="sm")
+
+    return (
+        [],
+        int(counts.get("Promoted", 0)),
+        int(counts.get("Demoted", 0)),
+        int(counts.get("New", 0)),
+        int(counts.get("Dropped", 0)),
+        figure,
+        table,
+    )
@@ -1,11 +1,13 @@
 import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
 from dash import Input, Output, callback, dcc, html
 
-from dashboard.caching import retrieve_data
+from dashboard.caching import retrieve_green_star_map
+from dashboard.data.cuisine_index import filter_by_cuisine
 from dashboard.decorators import load_df
 from dashboard.graphs.graphs import graph_green_star_map, graph_map_cuisine
+from dashboard.instrumentation import instrument, stage
+from dashboard.store import DatasetStore
 from dashboard.utils import TITLE
 
 PAGE_TITLE = "Geospatial Analysis"
@@ -14,7 +16,6 @@ dash.register_page(__name__, name=PAGE_TITLE, title=f"{PAGE_TITLE} | {TITLE}", p
 
 
 def layout():
-    df = retrieve_data()
     return [
         html.H3(PAGE_TITLE, className="mb-3"),
         html.P(
@@ -33,7 +34,7 @@ def layout():
                             """),
                                 dcc.Dropdown(
                                     id="cuisine-dropdown",
-                                    options=construct_cuisine_dropdown(df),
+                                    options=DatasetStore().get_catalog()["cuisines"],
                                     placeholder="Select a cuisine type",
                                     className="my-2",
                                 ),
@@ -58,7 +59,7 @@ def layout():
                                 The Green Star of Michelin recognizes restaurants for their commitment to sustainability
                                 and environmentally friendly practices.
                             """),
-                                dcc.Graph(id="green-star-map", figure=graph_green_star_map(df)),
+                                dcc.Graph(id="green-star-map"),
                             ]
                         ),
                         class_name="h-100",
@@ -71,22 +72,27 @@ def layout():
     ]
 
 
-def construct_cuisine_dropdown(df: pd.DataFrame) -> list[str]:
-    """Construct a list with options for the cuisine dropdown."""
-    cuisine_options = []
-    cuisines = df[df["Cuisine"].notna()]["Cuisine"].unique().tolist()
-    for cuisine in cuisines:
-        cuisine_options += cuisine.split(", ")
-
-    return sorted(list(set(cuisine_options)))
-
-
 @callback(Output("cuisine-map", "figure"), Input("cuisine-dropdown", "value"))
+@instrument("geo_cuisine_map")
 @load_df
 def display_cuisine_map(df, selected_cuisine):
-    if selected_cuisine:
-        filtered_df = df[df["Cuisine"] == selected_cuisine]
-    else:
-        filtered_df = df  # Show all if no selection
+    with stage("filter"):
+        if selected_cuisine:
+            filtered_df = filter_by_cuisine(df, DatasetStore().get_cuisine_index(df), selected_cuisine)
+        else:
+            filtered_df = df  # Show all if no selection
+
+    with stage("figure"):
+        return graph_map_cuisine(filtered_df)
+
 
-    return graph_map_cuisine(filtered_df)
+@callback(Output("green-star-map", "figure"), Input("green-star-map", "id"))
+@instrument("geo_green_star_map")
+def display_green_star_map(_):
+    """Load the Green Star map once the page is shown, as it does not depend on any input."""
+    store = DatasetStore()
+    df = store.get()
+    version = store.version_of(df)
+    if version is None:  # Datasets which are not loaded from the partitions are not cached
+        return graph_green_star_map(df)
+    return retrieve_green_star_map(version, df)
@@ -1,12 +1,16 @@
-import os
+import uuid
 from datetime import datetime
 
 import dash
 import dash_bootstrap_components as dbc
-from dash import ALL, Input, Output, State, callback, dcc, html
+from dash import ALL, Input, Output, Patch, State, callback, dcc, html
 from loguru import logger
 
-from dashboard.data.llm import LLM
+from dashboard.caching import retrieve_analysis_answer
+from dashboard.data.history import PAGE_SIZE, History
+from dashboard.data.llm import api_key_missing
+from dashboard.data.loader import dataset_version
+from dashboard.jobs import BUSY, DONE, POLL_INTERVAL, RUNNING, JobStore, render_job, start_job
 from dashboard.utils import TITLE
 
 PAGE_TITLE = "LLM Analysis"
@@ -20,9 +24,18 @@ RECOMMENDED_PROMPTS = [
 dash.register_page(__name__, name=PAGE_TITLE, title=f"{PAGE_TITLE} | {TITLE}", order=3)
 
 
-def layout():
+def layout(session: str | None = None, **kwargs):
+    """Layout of the page, a `session` query parameter shows the (shared) history of that session read-only."""
     return dbc.Container(
         [
+            # Id of the session of the browser, and of a session shared through a link
+            dcc.Store(id="analysis-session", storage_type="local"),
+            dcc.Store(id="analysis-shared-session", data=session),
+            # Id of the oldest entry of the history which is displayed
+            dcc.Store(id="analysis-history-oldest"),
+            # Job answering the question, which is polled until it is done
+            dcc.Store(id="analysis-job"),
+            dcc.Interval(id="analysis-job-interval", interval=POLL_INTERVAL, disabled=True),
             # Hero section
             dbc.Container(
                 [
@@ -37,6 +50,13 @@ def layout():
                         style={"minHeight": "50px"},
                         class_name="mt-3",
                     ),
+                    dbc.Switch(
+                        id="analysis-use-context",
+                        label="Use previous answers as context",
+                        value=False,
+                        class_name="mt-2 d-inline-block",
+                    ),
+                    html.Br(),
                     dbc.Button("Submit", color="primary", id="analysis-submit-button", className="mt-2"),
                 ],
                 className="py-4 text-center bg-light rounded-3 shadow-sm",
@@ -59,7 +79,7 @@ def layout():
                         ],
                         color="danger",
                     )
-                    if not os.getenv("OPENAI_API_KEY")
+                    if api_key_missing()
                     else None,
                 ]
             ),
@@ -103,6 +123,13 @@ def layout():
                         dbc.CardHeader("Prompt History", className="bg-info text-white"),
                         dbc.CardBody(
                             [
+                                dbc.Button(
+                                    "Show older questions",
+                                    id="analysis-history-older",
+                                    color="link",
+                                    size="sm",
+                                    style={"display": "none"},
+                                ),
                                 dbc.Table(
                                     [
                                         html.Thead(
@@ -114,12 +141,11 @@ def layout():
                                                 ]
                                             )
                                         ),
-                                        html.Tr(
-                                            html.Td("No questions asked yet."), id="analysis-history-list-placeholder"
-                                        ),
+                                        html.Tbody([], id="analysis-history-list"),
                                     ],
-                                    id="analysis-history-list",
-                                )
+                                ),
+                                html.P("No questions asked yet.", id="analysis-history-list-placeholder"),
+                                html.A("Link to share this history", id="analysis-share-link", href=""),
                             ]
                         ),
                     ],
@@ -133,11 +159,94 @@ def layout():
     )
 
 
+def history_row(entry: dict) -> html.Tr:
+    """Create the row of an entry of the history."""
+    asked = datetime.fromtimestamp(entry["asked"]).strftime("%Y-%m-%d %H:%M:%S")
+    return html.Tr([html.Td(asked), html.Td(entry["question"]), html.Td(dcc.Markdown(entry["answer"]))])
+
+
+def older_button_style(entries: list[dict]) -> dict:
+    """Only show the button to load older entries when the history has more entries."""
+    return {} if len(entries) > PAGE_SIZE else {"display": "none"}
+
+
+@callback(
+    Output("analysis-session", "data"),
+    Input("analysis-session", "modified_timestamp"),
+    State("analysis-session", "data"),
+)
+def init_session(_, session):
+    """Create the session of the browser on the first visit, which is kept in the local storage of the browser."""
+    if session is None:
+        return uuid.uuid4().hex
+    return dash.no_update
+
+
 @callback(
     [
-        Output("analysis-result-output", "children"),
         Output("analysis-history-list", "children"),
+        Output("analysis-history-oldest", "data"),
+        Output("analysis-history-older", "style"),
         Output("analysis-history-list-placeholder", "children"),
+        Output("analysis-share-link", "href"),
+    ],
+    Input("analysis-session", "data"),
+    State("analysis-shared-session", "data"),
+)
+def load_history(session, shared_session):
+    """Show the most recent entries of the history, of the shared session when the page is opened with its link."""
+    session = shared_session or session
+    if session is None:
+        return dash.no_update
+
+    # One more entry than displayed is retrieved, to know whether there are older entries
+    entries = History().page(session, limit=PAGE_SIZE + 1)
+    style = older_button_style(entries)
+    entries = entries[-PAGE_SIZE:]
+    return (
+        [history_row(entry) for entry in entries],
+        entries[0]["id"] if entries else None,
+        style,
+        [] if entries else "No questions asked yet.",
+        f"?session={session}",
+    )
+
+
+@callback(
+    [
+        Output("analysis-history-list", "children", allow_duplicate=True),
+        Output("analysis-history-oldest", "data", allow_duplicate=True),
+        Output("analysis-history-older", "style", allow_duplicate=True),
+    ],
+    Input("analysis-history-older", "n_clicks"),
+    [
+        State("analysis-history-oldest", "data"),
+        State("analysis-session", "data"),
+        State("analysis-shared-session", "data"),
+    ],
+    prevent_initial_call=True,
+)
+def load_older_history(_, oldest, session, shared_session):
+    """Add the previous page of the history, only the older entries are sent to the browser."""
+    session = shared_session or session
+    if session is None or oldest is None:
+        return dash.no_update
+
+    entries = History().page(session, before=oldest, limit=PAGE_SIZE + 1)
+    style = older_button_style(entries)
+    entries = entries[-PAGE_SIZE:]
+
+    rows = Patch()
+    for entry in reversed(entries):
+        rows.prepend(history_row(entry))
+    return rows, entries[0]["id"] if entries else oldest, style
+
+
+@callback(
+    [
+        Output("analysis-result-output", "children"),
+        Output("analysis-job", "data"),
+        Output("analysis-job-interval", "disabled"),
     ],
     [
         Input("analysis-submit-button", "n_clicks"),
@@ -145,12 +254,14 @@ def layout():
     ],
     [
         State("analysis-question-input", "value"),
-        State("analysis-history-list", "children"),
+        State("analysis-use-context", "value"),
+        State("analysis-session", "data"),
+        State("analysis-shared-session", "data"),
     ],
     prevent_initial_call=True,
 )
-def update_result(_, __, user_question, history_list):
-    """Update results for the LLM analysis page."""
+def update_result(_, __, user_question, use_context, session, shared_session):
+    """Start answering the question in the background, the progress is shown by `poll_result`."""
     trigger = dash.callback_context.triggered_id
 
     if isinstance(trigger, dict) and trigger["type"] == "analysis-recommended-prompt":
@@ -162,17 +273,67 @@ def update_result(_, __, user_question, history_list):
         raise ValueError(f"Incorrect trigger: {trigger}")
 
     if not prompt:
-        return "Please provide a question.", dash.no_update, dash.no_update
+        return "Please provide a question.", None, True
+
+    # A shared history is read-only, it is only used as context and the entry is added to the history of the viewer
+    context_session = shared_session or session
+    context = History().context(context_session) if use_context and context_session else None
+    version = dataset_version()
 
-    result = LLM().invoke_analysis_llm(prompt)
+    def run(handler):
+        # Identical questions (e.g. the recommended prompts) are answered once per dataset version and context
+        answer = retrieve_analysis_answer(" ".join(prompt.split()), version, context, callbacks=[handler])
+        return answer, History().add(session, prompt, answer) if session else None
+
+    job_id = start_job("analysis", run)
+    return render_job({"steps": [], "output": ""}), job_id, False
+
+
+@callback(
+    [
+        Output("analysis-result-output", "children", allow_duplicate=True),
+        Output("analysis-job", "data", allow_duplicate=True),
+        Output("analysis-job-interval", "disabled", allow_duplicate=True),
+        Output("analysis-history-list", "children", allow_duplicate=True),
+        Output("analysis-history-list-placeholder", "children", allow_duplicate=True),
+        Output("analysis-history-oldest", "data", allow_duplicate=True),
+    ],
+    Input("analysis-job-interval", "n_intervals"),
+    [
+        State("analysis-job", "data"),
+        State("analysis-history-oldest", "data"),
+        State("analysis-session", "data"),
+        State("analysis-shared-session", "data"),
+    ],
+    prevent_initial_call=True,
+)
+def poll_result(_, job_id, oldest, session, shared_session):
+    """Show the progress of the job answering the question, and add the answer to the history when it is done."""
+    if job_id is None:
+        return dash.no_update, None, True, dash.no_update, dash.no_update, dash.no_update
 
-    result = dcc.Markdown(result)
+    job = JobStore().get(job_id)
+    if job is None:
+        message = "The answer is no longer available, please ask again."
+        return message, None, True, dash.no_update, dash.no_update, dash.no_update
+    if job["status"] == RUNNING:
+        return render_job(job), dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    if job["status"] == BUSY:
+        busy_message = "Many questions are being answered right now, please try again in a moment."
+        return busy_message, None, True, dash.no_update, dash.no_update, dash.no_update
+    if job["status"] != DONE:
+        message = "Answering the question failed, please try again."
+        return message, None, True, dash.no_update, dash.no_update, dash.no_update
 
-    # Add to history
-    new_history = html.Tr([html.Td(datetime.now().strftime("%H:%M:%S")), html.Td(prompt), html.Td(result)])
-    history_list = (history_list or []) + [new_history]
+    entry = job["result"]
+    # The entry is added to the history of the viewer, which is not displayed while viewing a shared history
+    if entry is None or shared_session not in (None, session):
+        return dcc.Markdown(job["output"]), None, True, dash.no_update, dash.no_update, dash.no_update
 
-    return result, history_list, []
+    # Only the new entry is sent to the browser, instead of the whole history
+    rows = Patch()
+    rows.append(history_row(entry))
+    return dcc.Markdown(job["output"]), None, True, rows, [], oldest if oldest is not None else entry["id"]
 
 
 @callback(
@@ -3,16 +3,13 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash import Input, Output, callback, dcc, html
 
-from dashboard.data.utils import number_of_countries, number_of_restaurants, top_cuisine
+from dashboard.caching import TIMEOUT, figures_cache
+from dashboard.data.aggregates import CodeTable
+from dashboard.data.utils import number_of_restaurants
 from dashboard.decorators import load_df
-from dashboard.graphs.graphs import (
-    graph_award_distribution,
-    graph_green_star_distribution,
-    graph_price_distribution_normalized,
-    graph_top_cities,
-    graph_top_countries,
-    graph_top_cuisine,
-)
+from dashboard.graphs.graphs import graph_counts, graph_green_star_counts, graph_price_normalized_counts
+from dashboard.instrumentation import instrument, stage
+from dashboard.store import DatasetStore
 from dashboard.utils import TITLE
 
 PAGE_TITLE = "Overview"
@@ -185,6 +182,37 @@ def layout():
     ]
 
 
+def overview_response(df: pd.DataFrame, code_table: CodeTable) -> tuple:
+    """Compute the numbers and figures of the Overview page.
+
+    The figures are returned as dicts, so they are not serialized again when the response is served from cache.
+    """
+    with stage("aggregate"):
+        # Count all columns in a single pass, instead of scanning the dataset per number and figure
+        counts = code_table.counts()
+        numbers = (
+            len(counts["Country"]),
+            number_of_restaurants(df),
+            counts["Cuisine"].index[0] if len(counts["Cuisine"]) else "-",
+        )
+    with stage("figure"):
+        figures = (
+            graph_counts(counts["Country"], top=10),
+            graph_counts(counts["City"], top=10),
+            graph_counts(counts["Cuisine"], top=10),
+            graph_counts(counts["Award"]),
+            graph_green_star_counts(counts["GreenStar"]),
+            graph_price_normalized_counts(counts["Price (normalized)"]),
+        )
+    return numbers + tuple(figure.to_dict() for figure in figures)
+
+
+@figures_cache.memoize(timeout=TIMEOUT, args_to_ignore=["df"])
+def retrieve_overview(version: str, df: pd.DataFrame) -> tuple:
+    """Function used to cache the response of the Overview page of a dataset version, given its dataset."""
+    return overview_response(df, DatasetStore().get_code_table(df))
+
+
 @callback(
     [
         Output("home-number-of-countries", "children"),
@@ -199,17 +227,14 @@ def layout():
     ],
     Input("home-number-of-countries", "children"),  # Trigger on page load
 )
+@instrument("overview")
 @load_df
 def update_overview(df: pd.DataFrame, _) -> tuple:
-    """Callback to update numbers on the top of homepage."""
-    return (
-        number_of_countries(df),
-        number_of_restaurants(df),
-        top_cuisine(df),
-        graph_top_countries(df),
-        graph_top_cities(df),
-        graph_top_cuisine(df),
-        graph_award_distribution(df),
-        graph_green_star_distribution(df),
-        graph_price_distribution_normalized(df),
-    )
+    """Callback to update numbers on the top of homepage.
+
+    The page is identical for all users, so it is computed once per dataset version.
+    """
+    version = DatasetStore().version_of(df)
+    if version is None:  # Datasets which are not loaded from the partitions (e.g. in benchmarks) are not cached
+        return overview_response(df, DatasetStore().get_code_table(df))
+    return retrieve_overview(version, df)
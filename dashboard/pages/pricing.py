@@ -1,25 +1,29 @@
 import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
 from dash import Input, Output, callback, dcc, html
 
-from dashboard.caching import retrieve_data
-from dashboard.data.utils import unique_countries
-from dashboard.decorators import filter_by_country, load_df
+from dashboard.data.ranking import RANKING_COLUMNS
 from dashboard.graphs.graphs import (
-    graph_heatmap_price,
-    graph_price_distribution,
+    graph_heatmap_price_counts,
+    graph_price_counts,
     graph_scatter_best_value,
+    graph_scatter_best_value_cells,
 )
+from dashboard.instrumentation import instrument, stage
+from dashboard.store import DatasetStore
 from dashboard.utils import TITLE
 
 PAGE_TITLE = "Pricing"
+BEST_VALUE_RESULTS = 10
+
+# Modes of the best value plot
+PER_CATEGORY = "category"
+PER_RESTAURANT = "restaurant"
 
 dash.register_page(__name__, name=PAGE_TITLE, title=f"{PAGE_TITLE} | {TITLE}", order=2)
 
 
 def layout():
-    df = retrieve_data()
     return [
         html.H3("Pricing", className="mb-3"),
         html.P(
@@ -30,7 +34,7 @@ def layout():
         dbc.Row(
             dbc.Col(
                 dcc.Dropdown(
-                    sorted(unique_countries(df)),
+                    DatasetStore().get_catalog()["countries"],
                     value="France",
                     clearable=False,
                     id="pricing-country-dropdown-selection",
@@ -94,6 +98,15 @@ def layout():
                                             ".",
                                         ]
                                     ),
+                                    dbc.RadioItems(
+                                        options=[
+                                            {"label": "Per category", "value": PER_CATEGORY},
+                                            {"label": "Per restaurant", "value": PER_RESTAURANT},
+                                        ],
+                                        value=PER_CATEGORY,
+                                        inline=True,
+                                        id="pricing-best-value-mode",
+                                    ),
                                     dcc.Graph(id="pricing-best-value-scatter"),
                                 ]
                             ),
@@ -101,6 +114,18 @@ def layout():
                     ],
                     width=12,
                 ),
+                dbc.Col(
+                    dbc.Card(
+                        dbc.CardBody(
+                            [
+                                html.H4("Top restaurants by value"),
+                                html.P("The restaurants with the highest award for their price."),
+                                html.Div(id="pricing-best-value-table"),
+                            ]
+                        ),
+                    ),
+                    width=12,
+                ),
             ],
             class_name="g-3",
         ),
@@ -110,15 +135,58 @@ def layout():
 @callback(
     [
         Output("pricing-graph-price-distribution", "figure"),
-        Output("pricing-best-value-scatter", "figure"),
         Output("pricing-graph-heatmap", "figure"),
     ],
     [
         Input("pricing-country-dropdown-selection", "value"),
     ],
 )
-@load_df
-@filter_by_country
-def update_price_distribution(df: pd.DataFrame):
-    """Update the price distribution graph."""
-    return (graph_price_distribution(df), graph_scatter_best_value(df), graph_heatmap_price(df))
+@instrument("pricing")
+def update_price_distribution(country: str):
+    """Update the price distribution graph, from the counts which are precomputed per country."""
+    with stage("aggregate"):
+        cube = DatasetStore().get_price_cube()
+        price_counts, award_price_counts = cube.price_counts(country), cube.award_price_counts(country)
+    with stage("figure"):
+        return (graph_price_counts(price_counts), graph_heatmap_price_counts(award_price_counts))
+
+
+@callback(
+    Output("pricing-best-value-scatter", "figure"),
+    [
+        Input("pricing-country-dropdown-selection", "value"),
+        Input("pricing-best-value-mode", "value"),
+    ],
+)
+@instrument("pricing_scatter")
+def update_best_value_scatter(country: str, mode: str = PER_CATEGORY):
+    """Update the best value plot, with a bubble per award and price category or per restaurant."""
+    if mode == PER_RESTAURANT:
+        with stage("filter"):
+            df = DatasetStore().get()
+            df = df[df["Country"] == country]
+        with stage("figure"):
+            return graph_scatter_best_value(df)
+
+    with stage("aggregate"):
+        cells = DatasetStore().get_price_cube().cells(country)
+    with stage("figure"):
+        return graph_scatter_best_value_cells(cells)
+
+
+@callback(
+    Output("pricing-best-value-table", "children"),
+    Input("pricing-country-dropdown-selection", "value"),
+)
+@instrument("pricing_best_value")
+def update_best_value_table(country: str):
+    """Update the table of the restaurants with the best value, which are precomputed per country."""
+    with stage("aggregate"):
+        results = DatasetStore().get_ranking().best_value(country=country, limit=BEST_VALUE_RESULTS)
+
+    if results.empty:
+        return dbc.Alert("No restaurants with a known price found.", color="light")
+
+    with stage("figure"):
+        table = dbc.Table.from_dataframe(results[RANKING_COLUMNS], striped=True, hover=True, size="sm")
+    return table
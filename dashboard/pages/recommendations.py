@@ -1,12 +1,11 @@
-import os
-
 import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
 from dash import Input, Output, State, callback, dcc, html
 
-from dashboard.caching import retrieve_data
-from dashboard.data.llm import LLM
+from dashboard.data.llm import LLM, api_key_missing
+from dashboard.data.recommendations import find_candidates, format_candidates, preference_mask
+from dashboard.jobs import BUSY, DONE, POLL_INTERVAL, RUNNING, JobStore, render_job, start_job
+from dashboard.store import DatasetStore
 from dashboard.utils import TITLE
 
 PAGE_TITLE = "Recommendations"
@@ -15,7 +14,7 @@ dash.register_page(__name__, name=PAGE_TITLE, title=f"{PAGE_TITLE} | {TITLE}", o
 
 
 def layout():
-    df = retrieve_data()
+    catalog = DatasetStore().get_catalog()
     return dbc.Container(
         [
             # Hero section
@@ -48,7 +47,7 @@ def layout():
                         ],
                         color="danger",
                     )
-                    if not os.getenv("OPENAI_API_KEY")
+                    if api_key_missing()
                     else None,
                 ]
             ),
@@ -67,7 +66,7 @@ def layout():
                                                     [
                                                         dbc.Label("Location Preference"),
                                                         dcc.Dropdown(
-                                                            options=construct_location_options(df),
+                                                            options=catalog["locations"],
                                                             id="location-preference",
                                                             placeholder="Enter city or country",
                                                         ),
@@ -83,7 +82,7 @@ def layout():
                                                     [
                                                         dbc.Label("Cuisine Preference"),
                                                         dcc.Dropdown(
-                                                            options=construct_cuisine_options(df),
+                                                            options=catalog["cuisines"],
                                                             id="cuisine-preference",
                                                             placeholder="Enter preferred cuisine",
                                                         ),
@@ -203,6 +202,9 @@ def layout():
                             [
                                 html.Div(id="recommendations-form-alert"),
                                 html.Div("No results yet.", id="recommendations-form-output"),
+                                # Job making the recommendation, which is polled until it is done
+                                dcc.Store(id="recommendations-job"),
+                                dcc.Interval(id="recommendations-job-interval", interval=POLL_INTERVAL, disabled=True),
                             ]
                         ),
                     ],
@@ -215,26 +217,12 @@ def layout():
     )
 
 
-def construct_location_options(df: pd.DataFrame) -> list[str]:
-    locations = (
-        df[df["Country"].notna()]["Country"].unique().tolist() + df[df["City"].notna()]["City"].unique().tolist()
-    )
-    return sorted(locations)
-
-
-def construct_cuisine_options(df: pd.DataFrame) -> list[str]:
-    cuisine_options = []
-    cuisines = df[df["Cuisine"].notna()]["Cuisine"].unique().tolist()
-    for cuisine in cuisines:
-        cuisine_options += cuisine.split(", ")
-
-    return sorted(list(set(cuisine_options)))
-
-
 @callback(
     [
         Output("recommendations-form-output", "children"),
         Output("recommendations-form-alert", "children"),
+        Output("recommendations-job", "data"),
+        Output("recommendations-job-interval", "disabled"),
     ],
     [
         Input("submit-button", "n_clicks"),
@@ -251,16 +239,68 @@ def construct_cuisine_options(df: pd.DataFrame) -> list[str]:
 def process_form(
     n_clicks, location_preference, cuisine_preference, price_range, award_range, description_of_restaurant
 ):
+    """Start making the recommendation in the background, the progress is shown by `poll_recommendation`."""
     if not price_range:
-        return [], dbc.Alert("Please select at least one price option.", color="danger")
+        return [], dbc.Alert("Please select at least one price option.", color="danger"), None, True
     if not award_range:
-        return [], dbc.Alert("Please select at least one award option.", color="danger")
+        return [], dbc.Alert("Please select at least one award option.", color="danger"), None, True
 
-    result = LLM().invoke_recommendations_llm(
-        location_preference,
-        cuisine_preference,
-        price_range,
-        award_range,
+    store = DatasetStore()
+    df = store.get()
+    mask = preference_mask(
+        df, store.get_cuisine_index(df), location_preference, cuisine_preference, price_range, award_range
+    )
+    candidates = find_candidates(
+        store.get_search_index(df),
+        store.get_vector_index(df),
         description_of_restaurant,
+        mask,
+        ranking=store.get_ranking(df),
     )
-    return dcc.Markdown(result), []
+
+    def run(handler):
+        result = LLM().invoke_recommendations_llm(
+            location_preference,
+            cuisine_preference,
+            price_range,
+            award_range,
+            description_of_restaurant,
+            format_candidates(candidates),
+            callbacks=[handler],
+        )
+        return result, None
+
+    job_id = start_job("recommendations", run)
+    return render_job({"steps": [], "output": ""}), [], job_id, False
+
+
+@callback(
+    [
+        Output("recommendations-form-output", "children", allow_duplicate=True),
+        Output("recommendations-form-alert", "children", allow_duplicate=True),
+        Output("recommendations-job", "data", allow_duplicate=True),
+        Output("recommendations-job-interval", "disabled", allow_duplicate=True),
+    ],
+    Input("recommendations-job-interval", "n_intervals"),
+    State("recommendations-job", "data"),
+    prevent_initial_call=True,
+)
+def poll_recommendation(_, job_id):
+    """Show the progress of the job making the recommendation."""
+    if job_id is None:
+        return dash.no_update, dash.no_update, None, True
+
+    job = JobStore().get(job_id)
+    if job is None:
+        alert = dbc.Alert("The recommendation is no longer available, please try again.", color="warning")
+    elif job["status"] == RUNNING:
+        return render_job(job), dash.no_update, dash.no_update, dash.no_update
+    elif job["status"] == BUSY:
+        alert = dbc.Alert(
+            "Many recommendations are being made right now, please try again in a moment.", color="warning"
+        )
+    elif job["status"] != DONE:
+        alert = dbc.Alert("Making the recommendation failed, please try again.", color="danger")
+    else:
+        return dcc.Markdown(job["output"]), [], None, True
+    return [], alert, None, True
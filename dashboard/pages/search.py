@@ -0,0 +1,60 @@
+import dash
+import dash_bootstrap_components as dbc
+from dash import Input, Output, callback, dcc, html
+
+from dashboard.instrumentation import instrument, stage
+from dashboard.store import DatasetStore
+from dashboard.utils import TITLE
+
+PAGE_TITLE = "Search"
+MAX_RESULTS = 25
+RESULT_COLUMNS = ["Name", "Location", "Cuisine", "Price", "Award", "Description"]
+
+dash.register_page(__name__, name=PAGE_TITLE, title=f"{PAGE_TITLE} | {TITLE}", order=5)
+
+
+def layout():
+    return [
+        html.H3(PAGE_TITLE, className="mb-3"),
+        html.P(
+            """Search restaurants by name, cuisine or description. Misspelled names are matched as well.
+        """
+        ),
+        dbc.Row(
+            dbc.Col(
+                dcc.Input(
+                    id="search-query",
+                    type="search",
+                    debounce=True,
+                    placeholder="For example: seafood tasting menu",
+                    className="form-control",
+                ),
+                md=6,
+                sm=12,
+            ),
+            class_name="mt-1",
+        ),
+        html.Hr(),
+        html.Div(id="search-results"),
+    ]
+
+
+@callback(
+    Output("search-results", "children"),
+    Input("search-query", "value"),
+)
+@instrument("search")
+def update_search_results(query: str | None):
+    """Update the restaurants matching the query."""
+    if not query:
+        return []
+
+    with stage("search"):
+        results = DatasetStore().get_search_index().search_rows(query, MAX_RESULTS)
+
+    if results.empty:
+        return dbc.Alert("No restaurants found.", color="light")
+
+    with stage("figure"):
+        table = dbc.Table.from_dataframe(results[RESULT_COLUMNS], striped=True, hover=True, size="sm")
+    return table
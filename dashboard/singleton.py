@@ -1,3 +1,6 @@
+import threading
+
+
 class SingletonMeta(type):
     """
     The Singleton class can be implemented in different ways in Python. Some
@@ -7,12 +10,20 @@ class SingletonMeta(type):
 
     _instances = {}
 
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Instances may be created on first use by concurrent requests. Every class has its own lock, so creating a
+        # slow singleton (e.g. loading the dataset) does not block creating the others.
+        cls._lock = threading.Lock()
+
     def __call__(cls, *args, **kwargs):
         """
         Possible changes to the value of the `__init__` argument do not affect
         the returned instance.
         """
         if cls not in cls._instances:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls] = instance
+            with cls._lock:
+                if cls not in cls._instances:
+                    instance = super().__call__(*args, **kwargs)
+                    cls._instances[cls] = instance
         return cls._instances[cls]
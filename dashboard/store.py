@@ -0,0 +1,238 @@
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from dashboard.caching import TIMEOUT, aggregates_cache, dataset_cache, figures_cache, retrieve_data
+from dashboard.data.aggregates import CodeTable, PriceCube
+from dashboard.data.catalog import build_catalog
+from dashboard.data.cuisine_index import build_cuisine_index
+from dashboard.data.database import Database
+from dashboard.data.loader import dataset_version
+from dashboard.data.ranking import Ranking
+from dashboard.data.search import SearchIndex
+from dashboard.data.vectors import VectorIndex, restaurant_texts
+from dashboard.singleton import SingletonMeta
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, only threads of the same process are coordinated
+    fcntl = None
+
+# Higher values refresh the dataset earlier before it expires (XFetch), 0 refreshes when it expires
+REFRESH_BETA = float(os.getenv("DATASET_REFRESH_BETA", 1))
+LOCK_FILE = Path("cache/dataset.lock")
+RETRY_INTERVAL = 60  # Seconds before retrying a failed refresh
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive lock on a file, shared by all processes on the machine."""
+    if fcntl is None:
+        yield
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Closing the file releases the lock
+    with open(path, "a") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        yield
+
+
+class DatasetStore(metaclass=SingletonMeta):
+    """Hold the dataset in memory for the whole process.
+
+    The dataset is shared without copying it, so the entry points of the app enable the copy-on-write mode of pandas.
+
+    When the app is preloaded by gunicorn, the dataset is loaded once in the master process and shared with all
+    workers (copy-on-write) after forking, instead of each worker loading its own copy.
+
+    An expiring dataset is refreshed by a single background thread, while the stale dataset is still served. To
+    spread refreshes, every request has a chance to refresh the dataset before it expires (XFetch), which grows as
+    the expiry approaches.
+    """
+
+    def __init__(self) -> None:
+        logger.debug("DatasetStore object is being created..")
+        self.dataset = (None, None)  # The frame and its version, which are replaced together
+        self.derived = {}  # Structures derived from the dataset, with the frame they were built from
+        self.loaded_at = None
+        self.refreshed_at = None  # Wall time, compared between processes
+        self.load_duration = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def df(self) -> pd.DataFrame | None:
+        return self.dataset[0]
+
+    @property
+    def version(self) -> str | None:
+        return self.dataset[1]
+
+    def version_of(self, df: pd.DataFrame) -> str | None:
+        """Get the version of a frame, None if it is not the current dataset (e.g. replaced by a refresh)."""
+        current, version = self.dataset
+        return version if current is df else None
+
+    def load(self) -> pd.DataFrame:
+        """(Re)load the dataset into memory.
+
+        Only one process at a time recomputes the dataset. Processes that were waiting for it reuse the dataset cached
+        by that process, instead of recomputing it again. When the recomputed dataset has a new version, that process
+        also invalidates the data derived from the previous version, and loads the new version into the database which
+        is shared by all processes.
+        """
+        start = time.monotonic()
+        with file_lock(LOCK_FILE):
+            # The lock file is touched whenever the dataset is recomputed
+            recompute = self.refreshed_at is not None and LOCK_FILE.stat().st_mtime <= self.refreshed_at
+            if recompute:
+                dataset_cache.delete_memoized(retrieve_data)
+                LOCK_FILE.touch()
+            df = retrieve_data()
+            version = dataset_version()
+            if recompute and version != self.version:
+                self.invalidate_derived()
+                if Database().engine:  # Only when the process uses the database, e.g. not in benchmarks
+                    Database().load(df, version)
+
+        self.load_duration = time.monotonic() - start
+        self.refreshed_at = time.time()
+        return self.set(df, version)
+
+    def set(self, df: pd.DataFrame, version: str | None = None) -> pd.DataFrame:
+        """Replace the dataset held in memory (e.g. with a synthetic dataset for benchmarks).
+
+        Args:
+            df (pd.DataFrame): dataset
+            version (str | None): version of the dataset, used to store derived data. None for datasets which are not
+                loaded from the partitions.
+        """
+        self.dataset = (df, version)
+        self.derived = {}
+        self.loaded_at = time.monotonic()
+        return df
+
+    def invalidate_derived(self) -> None:
+        """Remove the aggregates and figures of previous dataset versions from the caches.
+
+        All aggregates and figures are keyed by the version of their dataset, so entries of previous versions are never
+        served again, but take up space until they expire. This clears the shared tiers and the memory tier of this
+        process. The memory tiers of other processes are not cleared, their entries are evicted as new entries arrive.
+        """
+        logger.info(f"Dataset version changed from {self.version}, invalidating cached aggregates and figures..")
+        aggregates_cache.clear()
+        figures_cache.clear()
+
+    def get(self) -> pd.DataFrame:
+        """Return the dataset, refreshing it in the background if it (almost) expired."""
+        if self.df is None:
+            with self.lock:
+                if self.df is None:
+                    self.load()
+            return self.df
+
+        if self.should_refresh():
+            self.refresh_in_background()
+        return self.df
+
+    def should_refresh(self) -> bool:
+        """Decide whether to refresh the dataset, with a probability which grows as the expiry approaches (XFetch).
+
+        Slower loads are started earlier, so they finish before the dataset expires.
+        """
+        age = time.monotonic() - self.loaded_at
+        # 1 - random() is in (0, 1], so the logarithm is defined
+        return age - self.load_duration * REFRESH_BETA * math.log(1 - random.random()) >= TIMEOUT
+
+    def refresh_in_background(self) -> None:
+        """Refresh the dataset in a background thread, unless another thread is already refreshing it."""
+        if not self.lock.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                self.load()
+            except Exception:
+                logger.exception("Refreshing the dataset failed, the stale dataset is served")
+                # Postpone the next attempt, instead of retrying on every request
+                self.loaded_at = time.monotonic() - TIMEOUT + RETRY_INTERVAL
+            finally:
+                self.lock.release()
+
+        threading.Thread(target=refresh, name="dataset-refresh", daemon=True).start()
+
+    def _derived(self, name: str, build: Callable[[pd.DataFrame], Any], df: pd.DataFrame | None = None) -> Any:
+        """Return a structure derived from the dataset, which is built on first use.
+
+        The structure is stored with the frame it was built from, so a structure built from a frame which was replaced
+        in the meantime (e.g. by a background refresh) is never served for the new frame.
+
+        Args:
+            name (str): name of the structure
+            build (Callable[[pd.DataFrame], Any]): function building the structure from a frame
+            df (pd.DataFrame | None): frame of the structure, by default the current dataset. Callers which combine
+                several structures pass the same frame, so all of them belong to the same dataset.
+        """
+        if df is None:
+            df = self.get()
+        owner, structure = self.derived.get(name, (None, None))
+        if owner is df:
+            return structure
+
+        structure = build(df)
+        if self.df is df:
+            self.derived[name] = (df, structure)
+        return structure
+
+    def get_code_table(self, df: pd.DataFrame | None = None) -> CodeTable:
+        """Return the categorical codes of the dataset, which are built on first use."""
+        return self._derived("code_table", CodeTable, df)
+
+    def get_cuisine_index(self, df: pd.DataFrame | None = None) -> dict[str, np.ndarray]:
+        """Return the cuisine index of the dataset, which is built on first use.
+
+        The index holds row positions, so it is only applied to the frame it was built from.
+        """
+        return self._derived("cuisine_index", build_cuisine_index, df)
+
+    def get_catalog(self, df: pd.DataFrame | None = None) -> dict[str, list[str]]:
+        """Return the dimension catalog (the options of the dropdowns) of the dataset, which is built on first use."""
+        return self._derived("catalog", lambda df: build_catalog(df, self.get_cuisine_index(df)), df)
+
+    def get_price_cube(self, df: pd.DataFrame | None = None) -> PriceCube:
+        """Return the restaurants per country, award and price of the dataset, which are built on first use."""
+        return self._derived("price_cube", PriceCube, df)
+
+    def get_ranking(self, df: pd.DataFrame | None = None) -> Ranking:
+        """Return the value ranking of the dataset, which is built on first use."""
+        return self._derived("ranking", Ranking, df)
+
+    def get_search_index(self, df: pd.DataFrame | None = None) -> SearchIndex:
+        """Return the search index of the dataset, which is built on first use.
+
+        The index is not built before gunicorn forks, as SQLite connections can not be shared between processes.
+        """
+        return self._derived("search_index", SearchIndex, df)
+
+    def get_vector_index(self, df: pd.DataFrame | None = None) -> VectorIndex:
+        """Return the vector index of the dataset, which is loaded on first use.
+
+        The vectors are stored per dataset version and memory-mapped, so workers share them through the page cache.
+        """
+
+        def build(df: pd.DataFrame) -> VectorIndex:
+            version = self.version_of(df)
+            if version:
+                return VectorIndex.load(df, version)
+            return VectorIndex.build(restaurant_texts(df))
+
+        return self._derived("vector_index", build, df)
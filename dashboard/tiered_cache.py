@@ -0,0 +1,403 @@
+import math
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from cachelib import BaseCache as CachelibBaseCache
+from cachelib import FileSystemCache, RedisCache
+from flask_caching.backends.base import BaseCache
+
+from dashboard.instrumentation import metrics
+
+
+def _record_eviction(namespace: str, tier: str, count: int = 1) -> None:
+    metrics.increment("dashboard_cache_evictions_total", count, namespace=namespace, tier=tier)
+
+
+def _record_size(namespace: str, tier: str, size: int) -> None:
+    metrics.set("dashboard_cache_bytes", size, namespace=namespace, tier=tier)
+
+
+class MemoryTier(CachelibBaseCache):
+    """In-process LRU cache, bounded by the pickled size of the values.
+
+    Values are kept as objects, so hits do not have to be unpickled. Every process has its own memory tier.
+    """
+
+    name = "memory"
+
+    def __init__(self, namespace: str, max_bytes: int, default_timeout: int = 300) -> None:
+        super().__init__(default_timeout)
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> (expires, size, value), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _expires(self, timeout: int | None) -> float:
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else 0
+
+    def _remove(self, key: str) -> bool:
+        item = self._items.pop(key, None)
+        if item is None:
+            return False
+        self._bytes -= item[1]
+        return True
+
+    def get(self, key: str):
+        return self.get_with_expiry(key)[0]
+
+    def get_with_expiry(self, key: str) -> tuple:
+        """Get a value and the time at which it expires (0 if it does not expire), (None, 0) if it is missing."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None, 0
+            if item[0] and item[0] < time.time():
+                self._remove(key)
+                return None, 0
+            self._items.move_to_end(key)
+            return item[2], item[0]
+
+    def set(self, key: str, value, timeout: int | None = None) -> bool:
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        # A value larger than the tier is not stored, but still replaces the previous value
+        stored = size <= self.max_bytes
+        with self._lock:
+            self._remove(key)
+
+            evicted = 0
+            if stored:
+                self._items[key] = (self._expires(timeout), size, value)
+                self._bytes += size
+
+                while self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._items)))
+                    evicted += 1
+            current_bytes = self._bytes
+
+        if evicted:
+            _record_eviction(self.namespace, self.name, evicted)
+        _record_size(self.namespace, self.name, current_bytes)
+        return stored
+
+    def add(self, key: str, value, timeout: int | None = None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            removed = self._remove(key)
+            current_bytes = self._bytes
+        _record_size(self.namespace, self.name, current_bytes)
+        return removed
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            item = self._items.get(key)
+            return item is not None and not (item[0] and item[0] < time.time())
+
+    def clear(self) -> bool:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+        _record_size(self.namespace, self.name, 0)
+        return True
+
+
+class SQLiteTier(CachelibBaseCache):
+    """Cache in a SQLite database, shared by all processes on the machine and bounded by the size of the values.
+
+    When the namespace exceeds its size, the entries which were stored first are evicted.
+    """
+
+    name = "shared"
+
+    def __init__(self, namespace: str, path: Path, max_bytes: int, default_timeout: int = 300) -> None:
+        super().__init__(default_timeout)
+        self.namespace = namespace
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (namespace TEXT, key TEXT, value BLOB, size INTEGER, expires REAL, "
+                "stored REAL, PRIMARY KEY (namespace, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_stored ON cache (namespace, stored)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread, connections are not reused by a forked process."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str):
+        return self.get_with_expiry(key)[0]
+
+    def get_with_expiry(self, key: str) -> tuple:
+        """Get a value and the time at which it expires, see `MemoryTier.get_with_expiry`."""
+        row = (
+            self._connection()
+            .execute("SELECT value, expires FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+            .fetchone()
+        )
+        if row is None or (row[1] and row[1] < time.time()):
+            return None, 0
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key: str, value, timeout: int | None = None) -> bool:
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            self.delete(key)
+            return False
+
+        timeout = self._normalize_timeout(timeout)
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, blob, len(blob), now + timeout if timeout else 0, now),
+            )
+            self._prune(connection, now)
+        return True
+
+    def _prune(self, connection: sqlite3.Connection, now: float) -> None:
+        """Remove expired entries and evict the oldest entries when the namespace exceeds its size."""
+        connection.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires > 0 AND expires < ?", (self.namespace, now)
+        )
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+        evicted = []
+        if total > self.max_bytes:
+            rows = connection.execute(
+                "SELECT key, size FROM cache WHERE namespace = ? ORDER BY stored", (self.namespace,)
+            ).fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((self.namespace, key))
+                total -= size
+            connection.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", evicted)
+
+        if evicted:
+            _record_eviction(self.namespace, self.name, len(evicted))
+        _record_size(self.namespace, self.name, total)
+
+    def add(self, key: str, value, timeout: int | None = None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key: str) -> bool:
+        with self._connection() as connection:
+            cursor = connection.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+        return cursor.rowcount > 0
+
+    def has(self, key: str) -> bool:
+        row = (
+            self._connection()
+            .execute("SELECT expires FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+            .fetchone()
+        )
+        return row is not None and not (row[0] and row[0] < time.time())
+
+    def clear(self) -> bool:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        _record_size(self.namespace, self.name, 0)
+        return True
+
+
+class DiskTier(FileSystemCache):
+    """Cache in a directory, bounded by the size of the files.
+
+    When the directory exceeds its size, the files which were written first are evicted.
+    """
+
+    name = "disk"
+
+    def __init__(self, namespace: str, cache_dir: Path, max_bytes: int, default_timeout: int = 300) -> None:
+        # A threshold of 0 disables pruning by the number of files
+        super().__init__(str(cache_dir), threshold=0, default_timeout=default_timeout)
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+
+    def get_with_expiry(self, key: str) -> tuple:
+        """Get a value and the time at which it expires, see `MemoryTier.get_with_expiry`."""
+        try:
+            with open(self._get_filename(key), "rb") as file:
+                # Files start with the time at which they expire, followed by the pickled value
+                expires = struct.unpack("I", file.read(4))[0]
+                if expires and expires < time.time():
+                    return None, 0
+                return self.serializer.load(file), expires
+        except (OSError, EOFError, struct.error, pickle.UnpicklingError):  # Missing or partially written files
+            return None, 0
+
+    def set(self, key: str, value, timeout: int | None = None, mgmt_element: bool = False) -> bool:
+        result = super().set(key, value, timeout, mgmt_element)
+        self._prune_size()
+        return result
+
+    def _prune_size(self) -> None:
+        files = []
+        for path in self._list_dir():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+
+        if evicted:
+            _record_eviction(self.namespace, self.name, evicted)
+        _record_size(self.namespace, self.name, total)
+
+
+class RedisTier(RedisCache):
+    """Cache in Redis, which can replace the SQLite tier to share the cache between machines."""
+
+    name = "redis"
+
+    def __init__(self, namespace: str, url: str, default_timeout: int = 300) -> None:
+        import redis
+
+        super().__init__(host=redis.from_url(url), key_prefix=f"{namespace}:", default_timeout=default_timeout)
+        self.namespace = namespace
+
+    def get_with_expiry(self, key: str) -> tuple:
+        """Get a value and the time at which it expires, see `MemoryTier.get_with_expiry`."""
+        pipeline = self._read_client.pipeline()
+        pipeline.get(self.key_prefix + key)
+        pipeline.pttl(self.key_prefix + key)
+        value, ttl = pipeline.execute()
+        if value is None:
+            return None, 0
+        # A negative time to live means that the key does not expire
+        return self.serializer.loads(value), time.time() + ttl / 1000 if ttl > 0 else 0
+
+
+class TieredCache(BaseCache):
+    """Cache which looks up values in a sequence of tiers, from the fastest to the slowest tier.
+
+    Values are written to all tiers. A value found in a slower tier is copied to the faster tiers before it (with the
+    time it has left in the slower tier), so the next lookup is served by the fastest tier.
+
+    Tiers implement `get_with_expiry`, which returns a value with the time at which it expires.
+    """
+
+    def __init__(self, namespace: str, tiers: list[CachelibBaseCache], default_timeout: int = 300) -> None:
+        super().__init__(default_timeout)
+        self.namespace = namespace
+        self.tiers = tiers
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        """Create the cache from the `CACHE_OPTIONS` of flask_caching, see `create_tiers` for the options."""
+        kwargs = dict(kwargs)
+        default_timeout = kwargs.pop("default_timeout", 300)
+        namespace = kwargs["namespace"]
+        return cls(namespace, create_tiers(default_timeout=default_timeout, **kwargs), default_timeout)
+
+    def _record_lookup(self, tier: CachelibBaseCache, result: str) -> None:
+        metrics.increment("dashboard_cache_requests_total", namespace=self.namespace, tier=tier.name, result=result)
+
+    def get(self, key: str):
+        for i, tier in enumerate(self.tiers):
+            value, expires = tier.get_with_expiry(key)
+            if value is None:
+                self._record_lookup(tier, "miss")
+                continue
+
+            self._record_lookup(tier, "hit")
+            # A timeout of 0 does not expire, like the value in the slower tier
+            timeout = max(1, math.ceil(expires - time.time())) if expires else 0
+            for faster_tier in self.tiers[:i]:
+                faster_tier.set(key, value, timeout)
+            return value
+        return None
+
+    def set(self, key: str, value, timeout: int | None = None) -> bool:
+        results = [tier.set(key, value, timeout) for tier in self.tiers]
+        return any(results)
+
+    def add(self, key: str, value, timeout: int | None = None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key: str) -> bool:
+        results = [tier.delete(key) for tier in self.tiers]
+        return any(results)
+
+    def has(self, key: str) -> bool:
+        return any(tier.has(key) for tier in self.tiers)
+
+    def clear(self) -> bool:
+        results = [tier.clear() for tier in self.tiers]
+        return all(results)
+
+
+def create_tiers(
+    namespace: str,
+    tiers: list[str],
+    directory: str,
+    memory_max_bytes: int,
+    shared_max_bytes: int,
+    disk_max_bytes: int,
+    redis_url: str | None = None,
+    default_timeout: int = 300,
+) -> list[CachelibBaseCache]:
+    """Create the tiers of a namespace.
+
+    Args:
+        namespace (str): namespace of the cache, e.g. the type of the cached values
+        tiers (list[str]): tiers to use, from fastest to slowest ("memory", "shared" and/or "disk")
+        directory (str): directory of the shared and disk tiers
+        memory_max_bytes (int): size of the memory tier (per process)
+        shared_max_bytes (int): size of the shared tier
+        disk_max_bytes (int): size of the disk tier
+        redis_url (str | None): URL of a Redis server to use as shared tier, instead of SQLite
+        default_timeout (int): default timeout in seconds
+
+    Returns:
+        list[CachelibBaseCache]: tiers
+    """
+    directory = Path(directory)
+    factories = {
+        "memory": lambda: MemoryTier(namespace, memory_max_bytes, default_timeout),
+        "shared": lambda: (
+            RedisTier(namespace, redis_url, default_timeout)
+            if redis_url
+            else SQLiteTier(namespace, directory / "shared.sqlite", shared_max_bytes, default_timeout)
+        ),
+        "disk": lambda: DiskTier(namespace, directory / namespace, disk_max_bytes, default_timeout),
+    }
+    return [factories[tier]() for tier in tiers]
@@ -0,0 +1,22 @@
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8050")
+workers = int(os.getenv("GUNICORN_WORKERS", 4))
+threads = int(os.getenv("GUNICORN_THREADS", 2))
+
+# Build the dataset (and SQLite database) once in the master process, workers share it after forking
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Move all objects to a permanent generation, so the garbage collector of a worker does not touch
+    # (and thereby copy) the memory pages shared with the master process
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from dashboard.data.database import Database
+
+    # SQLite connections must not be shared between processes
+    Database().reset_connections()
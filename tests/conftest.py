@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from dashboard.data.loader import add_features, clean_data
+
+# Name, location, price, cuisine, award, Green Star and description of the restaurants of the sample dataset
+RESTAURANTS = [
+    ("Le Jardin", "Paris, France", "€€€€", "French, Creative", "3 Stars", 1, "seasonal tasting menu garden vegetables"),
+    ("Bistro Paul", "Paris, France", "€€", "French", "Bib Gourmand", 0, "classic bistro dishes wine list"),
+    ("La Mer", "Lyon, France", "€€€", "Seafood", "1 Star", 0, "fresh seafood tasting menu harbour"),
+    ("Chez Marie", "Lyon, France", "€", "French", "Selected Restaurants", 1, "classic dishes garden vegetables"),
+    ("Sushi Ken", "Tokyo, Japan", "€€€€", "Japanese, Sushi", "3 Stars", 0, "sushi omakase counter fresh fish"),
+    ("Soba Ya", "Tokyo, Japan", "€", "Japanese", "Bib Gourmand", 0, "handmade soba noodles counter"),
+    ("Hawker Hall", "Singapore", "€", "Street Food", "Bib Gourmand", 0, "hawker stalls noodles rice"),
+    ("Garden Kitchen", "Amsterdam, Netherlands", "€€€", "Modern Cuisine", "2 Stars", 1, "seasonal garden dishes wine"),
+    ("Canal House", "Amsterdam, Netherlands", None, "Sushi", "Selected Restaurants", 0, "sushi fish rice canal"),
+]
+
+
+def make_dataset(restaurants: list[tuple] = RESTAURANTS) -> pd.DataFrame:
+    """Create a dataset like the one loaded from the source CSV, including its features."""
+    df = pd.DataFrame(
+        restaurants, columns=["Name", "Location", "Price", "Cuisine", "Award", "GreenStar", "Description"]
+    )
+    df["Address"] = "Street 1"
+    df["Longitude"] = [2.35 + i * 0.01 for i in range(len(df))]
+    df["Latitude"] = [48.85 + i * 0.01 for i in range(len(df))]
+    df["PhoneNumber"] = None
+    df["Url"] = "https://guide.michelin.com/" + df["Name"].str.lower().str.replace(" ", "-")
+    df["WebsiteUrl"] = None
+    df["FacilitiesAndServices"] = "Air conditioning"
+    return add_features(clean_data(df))
+
+
+@pytest.fixture
+def restaurants() -> pd.DataFrame:
+    return make_dataset()
+
+
+@pytest.fixture(autouse=True)
+def working_directory(tmp_path, monkeypatch):
+    """Run every test in its own directory, as the app stores its caches relative to the working directory."""
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from dashboard.data import database as database_module
+from dashboard.data.database import Database
+
+
+@pytest.fixture
+def database() -> Database:
+    Path("cache").mkdir()
+    return Database()
+
+
+def count(database: Database, query: str) -> int:
+    with database.engine.connect() as connection:
+        return connection.execute(text(query)).scalar()
+
+
+def france_count(database: Database) -> int:
+    return count(database, "SELECT SUM(count) FROM award_by_country WHERE Country = 'France'")
+
+
+def test_loads_dataset_with_version(database, restaurants):
+    database.load(restaurants, "2024-1")
+    assert database.stored_version() == "2024-1"
+    assert count(database, "SELECT COUNT(*) FROM michelin") == len(restaurants)
+    assert france_count(database) == 4
+
+
+def test_rebuilds_all_tables_for_new_version(database, restaurants):
+    database.load(restaurants, "2024-1")
+    database.load(restaurants[restaurants["Country"] != "France"], "2024-2")
+
+    assert database.stored_version() == "2024-2"
+    assert count(database, "SELECT COUNT(*) FROM michelin WHERE Country = 'France'") == 0
+    assert france_count(database) is None
+    assert count(database, "SELECT COUNT(*) FROM restaurant_cuisines WHERE Location LIKE '%France'") == 0
+
+
+def test_keeps_tables_of_same_version(database, restaurants):
+    database.load(restaurants, "2024-1")
+    # A process loading the same version reuses the tables, instead of loading the dataset again
+    database.load(restaurants.head(1), "2024-1")
+    assert count(database, "SELECT COUNT(*) FROM michelin") == len(restaurants)
+
+
+def test_failed_rebuild_keeps_previous_version(database, restaurants, monkeypatch):
+    database.load(restaurants, "2024-1")
+
+    def fail(df):
+        raise RuntimeError("Building the summary tables failed")
+
+    monkeypatch.setattr(database_module, "build_summary_tables", fail)
+    with pytest.raises(RuntimeError):
+        database.load(restaurants.head(1), "2024-2")
+
+    assert database.stored_version() == "2024-1"
+    assert count(database, "SELECT COUNT(*) FROM michelin") == len(restaurants)
+    assert france_count(database) == 4
+
+
+def test_schema_digest_per_version(database, restaurants):
+    database.load(restaurants, "2024-1")
+    assert "'France'" in Path("cache/michelin.2024-1.digest.txt").read_text()
+
+    database.load(restaurants[restaurants["Country"] != "France"], "2024-2")
+    assert "'France'" not in Path("cache/michelin.2024-2.digest.txt").read_text()
+    assert not Path("cache/michelin.2024-1.digest.txt").exists()
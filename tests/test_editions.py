@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from conftest import RESTAURANTS, make_dataset
+
+from dashboard.data.editions import award_movement
+from dashboard.data.loader import CURRENT_EDITION, available_editions
+
+
+def with_award(name: str, award: str) -> tuple:
+    restaurant = next(restaurant for restaurant in RESTAURANTS if restaurant[0] == name)
+    return restaurant[:4] + (award,) + restaurant[5:]
+
+
+def movements(df) -> dict[str, str]:
+    return dict(zip(df["Name"], df["Movement"]))
+
+
+def test_award_movement():
+    previous = make_dataset(
+        [
+            with_award("Le Jardin", "2 Stars"),  # promoted
+            with_award("Sushi Ken", "3 Stars"),  # unchanged
+            with_award("La Mer", "2 Stars"),  # demoted
+            with_award("Soba Ya", "Bib Gourmand"),  # dropped
+        ]
+    )
+    current = make_dataset(
+        [
+            with_award("Le Jardin", "3 Stars"),
+            with_award("Sushi Ken", "3 Stars"),
+            with_award("La Mer", "1 Star"),
+            with_award("Hawker Hall", "Bib Gourmand"),  # new
+        ]
+    )
+
+    df = award_movement(previous, current)
+
+    assert movements(df) == {
+        "Le Jardin": "Promoted",
+        "Sushi Ken": "Unchanged",
+        "La Mer": "Demoted",
+        "Soba Ya": "Dropped",
+        "Hawker Hall": "New",
+    }
+    dropped = df[df["Name"] == "Soba Ya"].iloc[0]
+    assert dropped["Country"] == "Japan"
+    assert dropped["Award (previous)"] == "Bib Gourmand"
+
+
+def test_award_movement_drops_duplicate_restaurants():
+    previous = make_dataset([with_award("La Mer", "1 Star"), with_award("La Mer", "2 Stars")])
+    current = make_dataset([with_award("La Mer", "2 Stars")])
+
+    df = award_movement(previous, current)
+
+    assert movements(df) == {"La Mer": "Promoted"}
+
+
+def test_editions_with_local_source():
+    assert available_editions() == [CURRENT_EDITION]
+
+    Path("cache").mkdir()
+    Path(f"cache/michelin_data_{CURRENT_EDITION - 1}.csv").touch()
+    assert available_editions() == [CURRENT_EDITION - 1, CURRENT_EDITION]
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from dashboard.data import guarded_database
+from dashboard.data.database import QueryRejectedError, set_statement_timeout
+from dashboard.data.guarded_database import GuardedSQLDatabase
+
+# Counts to infinity, unless it is interrupted
+RECURSIVE_QUERY = "WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter)"
+
+
+@pytest.fixture
+def engine(restaurants, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'michelin.db'}")
+    set_statement_timeout(engine)
+    restaurants.to_sql("michelin", engine, index=False)
+    return engine
+
+
+@pytest.fixture
+def database(engine):
+    return GuardedSQLDatabase(engine=engine)
+
+
+def count_rows(engine, command: str) -> int:
+    with engine.connect() as connection:
+        return len(connection.execute(text(command)).fetchall())
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "SELECT Name FROM michelin",
+        "SELECT Name FROM michelin LIMIT 1000",
+        "SELECT Name FROM michelin -- LIMIT 1000",
+        "SELECT Name FROM michelin; -- all restaurants",
+        "-- all restaurants\nSELECT Name FROM michelin",
+        "/* all restaurants */ WITH names AS (SELECT Name FROM michelin) SELECT * FROM names",
+    ],
+)
+def test_limits_rows_of_queries(engine, database, monkeypatch, command):
+    monkeypatch.setattr(guarded_database, "MAX_ROWS", 2)
+    guarded = database.guard(command)
+    assert guarded.endswith("LIMIT 2")
+    assert count_rows(engine, guarded) == 2
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        'SELECT a.Name FROM michelin a JOIN michelin b ON a."Value" < b."Value"',
+        'SELECT a.Name FROM michelin a, michelin b WHERE a.Description LIKE b.Description || "%"',
+        'SELECT Name FROM michelin a WHERE "Value" > (SELECT AVG("Value") FROM michelin b WHERE b.City = a.City)',
+    ],
+)
+def test_rejects_repeated_full_scans(database, command):
+    with pytest.raises(QueryRejectedError):
+        database.guard(command)
+
+
+def test_accepts_single_scan(database):
+    database.guard("SELECT Country, COUNT(*) FROM michelin GROUP BY Country ORDER BY COUNT(*) DESC")
+
+
+@pytest.mark.parametrize(
+    "command",
+    ["PRAGMA table_info(michelin)", "UPDATE michelin SET Name = 'x'", "EXPLAIN QUERY PLAN SELECT * FROM michelin"],
+)
+def test_passes_through_other_statements(database, command):
+    assert database.guard(f"  {command};") == command
+
+
+def test_interrupts_statement_after_timeout(database, monkeypatch):
+    monkeypatch.setattr(guarded_database, "STATEMENT_TIMEOUT", 0.2)
+    start = time.monotonic()
+    with pytest.raises(OperationalError, match="interrupted"):
+        database.run(f"{RECURSIVE_QUERY} SELECT COUNT(*) FROM counter")
+    assert time.monotonic() - start < 5
+
+
+def test_interrupts_fetching_rows_after_timeout(engine):
+    # SQLite computes the rows while they are fetched, after the statement has been executed
+    start = time.monotonic()
+    with engine.connect() as connection, pytest.raises(OperationalError, match="interrupted"):
+        result = connection.execution_options(statement_timeout=0.2).execute(
+            text(f"{RECURSIVE_QUERY} SELECT x FROM counter")
+        )
+        result.fetchall()
+    assert time.monotonic() - start < 5
+
+
+def test_statements_without_timeout_are_not_interrupted(engine):
+    with engine.connect() as connection:
+        connection.execution_options(statement_timeout=0.2).execute(text("SELECT 1")).fetchall()
+        # The deadline of the previous statement does not apply to the next statement of the connection
+        time.sleep(0.3)
+        rows = connection.execute(text(f"{RECURSIVE_QUERY} SELECT x FROM counter LIMIT 100000")).fetchall()
+    assert len(rows) == 100_000
@@ -0,0 +1,153 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from dashboard.data import llm as llm_module
+from dashboard.data.database import Database
+from dashboard.data.llm import LLM, PRIORITY_ANALYSIS, PRIORITY_RECOMMENDATIONS, LLMBusyError, LLMScheduler
+from dashboard.singleton import SingletonMeta
+
+
+@pytest.fixture
+def database(restaurants) -> Database:
+    Path("cache").mkdir()
+    database = Database()
+    database.load(restaurants, "2024-1")
+    return database
+
+
+@pytest.fixture
+def llm(database, monkeypatch) -> LLM:
+    monkeypatch.setattr(llm_module, "LLM_BACKEND", "fake")
+    monkeypatch.delitem(SingletonMeta._instances, LLM, raising=False)
+    return LLM()
+
+
+def test_rebuilds_agent_for_new_dataset_version(llm, database, restaurants):
+    agent = llm.get_agent()
+    assert llm.get_agent() is agent
+
+    # E.g. refreshed by another process
+    database.load(restaurants[restaurants["Country"] != "France"], "2024-2")
+    assert llm.get_agent() is not agent
+    assert llm.version == "2024-2"
+
+
+class Holder:
+    """Occupy a slot of the scheduler in a thread until released."""
+
+    def __init__(self, scheduler: LLMScheduler, priority: int = PRIORITY_ANALYSIS) -> None:
+        self.acquired = threading.Event()
+        self.released = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(scheduler, priority))
+        self.thread.start()
+
+    def run(self, scheduler: LLMScheduler, priority: int) -> None:
+        with scheduler.slot(priority):
+            self.acquired.set()
+            self.released.wait(10)
+
+    def release(self) -> None:
+        self.released.set()
+        self.thread.join()
+
+
+def wait_for_queue(scheduler: LLMScheduler, length: int) -> None:
+    deadline = time.monotonic() + 5
+    while len(scheduler.queue) != length:
+        assert time.monotonic() < deadline, "Timed out waiting for the queue"
+        time.sleep(0.01)
+
+
+def test_scheduler_serves_analysis_first():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=2, timeout=10)
+    holder = Holder(scheduler)
+    holder.acquired.wait(5)
+
+    order = []
+
+    def invoke(priority: int) -> None:
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    threads = []
+    for length, priority in enumerate([PRIORITY_RECOMMENDATIONS, PRIORITY_ANALYSIS], start=1):
+        threads.append(threading.Thread(target=invoke, args=(priority,)))
+        threads[-1].start()
+        wait_for_queue(scheduler, length)
+
+    holder.release()
+    for thread in threads:
+        thread.join()
+    assert order == [PRIORITY_ANALYSIS, PRIORITY_RECOMMENDATIONS]
+
+
+def test_scheduler_rejects_when_queue_is_full():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=1, timeout=10)
+    holder = Holder(scheduler)
+    holder.acquired.wait(5)
+    waiting = Holder(scheduler)
+    wait_for_queue(scheduler, 1)
+
+    start = time.monotonic()
+    with pytest.raises(LLMBusyError, match="full"), scheduler.slot(PRIORITY_ANALYSIS):
+        pass
+    # Rejected right away, instead of waiting for the timeout
+    assert time.monotonic() - start < 1
+
+    holder.release()
+    waiting.release()
+    assert scheduler.running == 0
+
+
+def test_scheduler_removes_timed_out_ticket():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=2, timeout=10)
+    holder = Holder(scheduler)
+    holder.acquired.wait(5)
+
+    # The first ticket in the queue gives up before the slot is released
+    errors = []
+
+    def give_up() -> None:
+        try:
+            scheduler._acquire(PRIORITY_ANALYSIS, time.monotonic() + 0.2)
+        except LLMBusyError as error:
+            errors.append(error)
+
+    first = threading.Thread(target=give_up)
+    first.start()
+    wait_for_queue(scheduler, 1)
+    later = Holder(scheduler, PRIORITY_RECOMMENDATIONS)
+    wait_for_queue(scheduler, 2)
+
+    first.join()
+    assert len(errors) == 1
+    assert [priority for priority, _ in scheduler.queue] == [PRIORITY_RECOMMENDATIONS]
+
+    holder.release()
+    assert later.acquired.wait(5)
+    later.release()
+    assert scheduler.running == 0
+    assert scheduler.queue == []
+
+
+@pytest.mark.skipif(llm_module.fcntl is None, reason="Global slots need fcntl")
+def test_scheduler_shares_global_slots():
+    # Schedulers of different processes only share the slot files
+    first = LLMScheduler(max_concurrent=1, max_concurrent_global=1, timeout=0.3)
+    second = LLMScheduler(max_concurrent=1, max_concurrent_global=1, timeout=0.3)
+
+    with first.slot(PRIORITY_ANALYSIS):
+        with pytest.raises(LLMBusyError, match="Timed out"), second.slot(PRIORITY_ANALYSIS):
+            pass
+        assert second.running == 0
+
+    with second.slot(PRIORITY_ANALYSIS):
+        pass
+
+    # Another global slot can be claimed while the first slot is occupied
+    third = LLMScheduler(max_concurrent=1, max_concurrent_global=2, timeout=0.3)
+    with first.slot(PRIORITY_ANALYSIS), third.slot(PRIORITY_ANALYSIS):
+        assert sorted(path.name for path in LLMScheduler.SLOT_DIR.iterdir()) == ["0.lock", "1.lock"]
@@ -0,0 +1,82 @@
+"""Verify that the graphs and callbacks never modify the shared dataset they are given."""
+
+import pandas as pd
+import pytest
+from dash import Dash
+
+from dashboard.decorators import fingerprint
+from dashboard.graphs import graphs
+from dashboard.store import DatasetStore
+
+# Pages can only be registered once an app using pages exists
+app = Dash(__name__, use_pages=True, pages_folder="")
+
+from dashboard.pages import countries, geo, overview, pricing, recommendations, search  # noqa: E402
+
+COUNTRY = "France"
+CUISINE = "Japanese"
+
+GRAPHS = [
+    graphs.graph_top_countries,
+    graphs.graph_top_cities,
+    graphs.graph_top_cuisine,
+    graphs.graph_award_distribution,
+    graphs.graph_green_star_distribution,
+    graphs.graph_map_cuisine,
+    graphs.graph_green_star_map,
+    graphs.graph_price_distribution_normalized,
+]
+# Graphs of a single country, which are given the restaurants of that country
+COUNTRY_GRAPHS = [
+    graphs.graph_map,
+    graphs.graph_price_distribution,
+    graphs.graph_scatter_best_value,
+    graphs.graph_heatmap_price,
+]
+
+CALLBACKS = {
+    "countries": lambda: countries.update_numbers(COUNTRY),
+    "overview": lambda: overview.update_overview(None),
+    "pricing": lambda: pricing.update_price_distribution(COUNTRY),
+    "pricing_scatter (per category)": lambda: pricing.update_best_value_scatter(COUNTRY, pricing.PER_CATEGORY),
+    "pricing_scatter (per restaurant)": lambda: pricing.update_best_value_scatter(COUNTRY, pricing.PER_RESTAURANT),
+    "pricing_best_value": lambda: pricing.update_best_value_table(COUNTRY),
+    "geo_cuisine_map": lambda: geo.display_cuisine_map(CUISINE),
+    "geo_cuisine_map (all)": lambda: geo.display_cuisine_map(None),
+    "geo_green_star_map": lambda: geo.display_green_star_map(None),
+    "search": lambda: search.update_search_results("sushi"),
+    "recommendations": lambda: recommendations.process_form(
+        1, COUNTRY, "French", ["Budget-Friendly", "Moderate"], ["Bib Gourmand"], "garden vegetables"
+    ),
+}
+
+
+@pytest.fixture
+def dataset(restaurants, monkeypatch):
+    """Serve the restaurants as the shared dataset, with copy-on-write enabled like the entry points of the app."""
+    # The recommendation is made by the LLM in a background job, only the candidates are computed by the callback
+    monkeypatch.setattr(recommendations, "start_job", lambda kind, func: "job")
+    with pd.option_context("mode.copy_on_write", True):
+        DatasetStore().set(restaurants)
+        yield restaurants
+
+
+@pytest.mark.parametrize("graph", GRAPHS, ids=lambda graph: graph.__name__)
+def test_graph_does_not_modify_dataset(dataset, graph):
+    before = fingerprint(dataset)
+    graph(dataset)
+    assert fingerprint(dataset) == before
+
+
+@pytest.mark.parametrize("graph", COUNTRY_GRAPHS, ids=lambda graph: graph.__name__)
+def test_country_graph_does_not_modify_dataset(dataset, graph):
+    before = fingerprint(dataset)
+    graph(dataset[dataset["Country"] == COUNTRY])
+    assert fingerprint(dataset) == before
+
+
+@pytest.mark.parametrize("callback", CALLBACKS.values(), ids=CALLBACKS.keys())
+def test_callback_does_not_modify_dataset(dataset, callback):
+    before = fingerprint(dataset)
+    callback()
+    assert fingerprint(dataset) == before
@@ -0,0 +1,17 @@
+import pytest
+
+from dashboard.data.cuisine_index import build_cuisine_index, filter_by_cuisine
+from dashboard.data.recommendations import preference_mask
+
+
+@pytest.mark.parametrize("cuisine", ["Japanese", "Sushi", "French", "Creative", "Unknown"])
+def test_preference_mask_matches_cuisine_filter(restaurants, cuisine):
+    index = build_cuisine_index(restaurants)
+    mask = preference_mask(restaurants, index, None, cuisine, None, None)
+    assert restaurants[mask]["Name"].tolist() == filter_by_cuisine(restaurants, index, cuisine)["Name"].tolist()
+
+
+def test_preference_mask_combines_preferences(restaurants):
+    index = build_cuisine_index(restaurants)
+    mask = preference_mask(restaurants, index, "Paris", "French", ["Moderate"], ["Bib Gourmand", "3 Stars"])
+    assert restaurants[mask]["Name"].tolist() == ["Bistro Paul"]
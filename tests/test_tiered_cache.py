@@ -0,0 +1,126 @@
+import pickle
+import time
+
+import pytest
+
+from dashboard import tiered_cache
+from dashboard.instrumentation import metrics
+from dashboard.tiered_cache import DiskTier, MemoryTier, SQLiteTier, TieredCache
+
+VALUE = b"x" * 100
+SIZE = len(pickle.dumps(VALUE, pickle.HIGHEST_PROTOCOL))
+
+
+class Clock:
+    """Replaces the time module of the cache, so entries expire without waiting."""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(tiered_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def namespace(request) -> str:
+    """Use a namespace per test, as the metrics are shared by all tests."""
+    return request.node.name
+
+
+def metric(name: str, namespace: str, tier: str) -> float:
+    return metrics._value(name, {"namespace": namespace, "tier": tier}).value
+
+
+def test_memory_tier_evicts_least_recently_used(namespace):
+    tier = MemoryTier(namespace, max_bytes=3 * SIZE)
+    for key in ["a", "b", "c"]:
+        tier.set(key, VALUE)
+    tier.get("a")
+    tier.set("d", VALUE)
+
+    assert [key for key in "abcd" if tier.has(key)] == ["a", "c", "d"]
+    assert metric("dashboard_cache_evictions_total", namespace, "memory") == 1
+    assert metric("dashboard_cache_bytes", namespace, "memory") == 3 * SIZE
+
+
+def test_memory_tier_accounts_size(namespace):
+    tier = MemoryTier(namespace, max_bytes=10 * SIZE)
+    tier.set("a", VALUE)
+    tier.set("a", VALUE)
+    tier.set("b", VALUE)
+    assert metric("dashboard_cache_bytes", namespace, "memory") == 2 * SIZE
+
+    tier.delete("a")
+    assert metric("dashboard_cache_bytes", namespace, "memory") == SIZE
+
+    # A value larger than the tier is not stored, and replaces the previous value
+    assert not tier.set("b", VALUE * 20)
+    assert not tier.has("b")
+    assert metric("dashboard_cache_bytes", namespace, "memory") == 0
+
+
+def test_sqlite_tier_evicts_first_stored(namespace, clock, tmp_path):
+    tier = SQLiteTier(namespace, tmp_path / "shared.sqlite", max_bytes=3 * SIZE)
+    for key in ["a", "b", "c"]:
+        tier.set(key, VALUE)
+        clock.now += 1
+    # Reading an entry does not keep it, unlike the memory tier
+    tier.get("a")
+    tier.set("d", VALUE)
+
+    assert [key for key in "abcd" if tier.has(key)] == ["b", "c", "d"]
+    assert metric("dashboard_cache_evictions_total", namespace, "shared") == 1
+    assert metric("dashboard_cache_bytes", namespace, "shared") == 3 * SIZE
+
+
+def test_sqlite_tier_removes_expired_entries(namespace, clock, tmp_path):
+    tier = SQLiteTier(namespace, tmp_path / "shared.sqlite", max_bytes=10 * SIZE)
+    tier.set("a", VALUE, timeout=10)
+    tier.set("b", VALUE, timeout=0)
+    clock.now += 11
+
+    assert tier.get("a") is None
+    tier.set("c", VALUE)
+    assert metric("dashboard_cache_bytes", namespace, "shared") == 2 * SIZE
+    # Expired entries are not evictions
+    assert metric("dashboard_cache_evictions_total", namespace, "shared") == 0
+
+
+@pytest.mark.parametrize("timeout, expires", [(100, 1_000_100.0), (0, 0)])
+def test_promotes_with_remaining_time(namespace, clock, tmp_path, timeout, expires):
+    memory = MemoryTier(namespace, max_bytes=10 * SIZE)
+    shared = SQLiteTier(namespace, tmp_path / "shared.sqlite", max_bytes=10 * SIZE)
+    cache = TieredCache(namespace, [memory, shared])
+
+    shared.set("a", VALUE, timeout)
+    clock.now += 40
+    assert memory.get_with_expiry("a") == (None, 0)
+
+    assert cache.get("a") == VALUE
+    assert memory.get_with_expiry("a") == (VALUE, expires)
+    assert shared.get_with_expiry("a") == (VALUE, expires)
+
+    if expires:
+        clock.now += 61
+        assert cache.get("a") is None
+
+
+def test_promotes_from_disk_tier(namespace, tmp_path):
+    memory = MemoryTier(namespace, max_bytes=10 * SIZE)
+    disk = DiskTier(namespace, tmp_path / namespace, max_bytes=10 * SIZE)
+    cache = TieredCache(namespace, [memory, disk])
+
+    disk.set("a", VALUE, timeout=100)
+    disk_expires = disk.get_with_expiry("a")[1]
+    assert cache.get("a") == VALUE
+
+    memory_expires = memory.get_with_expiry("a")[1]
+    assert disk_expires - 1 <= memory_expires <= disk_expires + 1
+    assert memory_expires < time.time() + 100 + 1